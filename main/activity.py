@@ -0,0 +1,110 @@
+import atexit
+import os
+from threading import Event, Lock, Thread, get_ident
+from db_module import activity_collection, config
+
+# Record fields tracked by the account_views & account_modifications counters
+COUNTED_FIELDS = ["username", "password", "first_name", "last_name", "dob", "gender", "role", "state", "comment"]
+# Every counter path of the activity documents
+COUNTERS = ["account_creations"] + ["account_views." + field for field in COUNTED_FIELDS] + ["account_modifications." + field for field in COUNTED_FIELDS]
+
+
+class ActivityCounter:
+    """
+    Summary of the ActivityCounter Class:
+        The ActivityCounter class aggregates the activity_collection counters (account_creations, account_views.*, account_modifications.*) in memory and writes them behind, as one combined $inc, instead of updating the counters document on every request.
+    The counters are spread over several shard documents ("C1:0" .. "C1:N-1"), each writer picks its shard by hashing its process & thread IDs, so writers from different app nodes don't all contend for a single document.
+
+    Key Attributes:
+        collection: The collection holding the counters documents.
+        document_id: The "_id" prefix of the counters documents (default is "C1").
+        flush_interval: Number of seconds between two periodic flushes.
+        shards: Number of shard documents the counters are spread over.
+
+    Methods:
+        increment: Adds counter increments to the pending, in-memory counts.
+        flush: Writes all pending counts to the writer's shard document in one update.
+        close: Stops the periodic flush and flushes the remaining counts, it is registered to run at process exit.
+        totals: Sums the counters of every shard document (and of the legacy, unsharded document) with one aggregation.
+
+    Notes:
+        - The background flush thread is started on the first increment, so importing the module costs nothing.
+        - If a flush fails, its counts are merged back into the pending counts and retried on the next flush.
+        - Counts are only visible in the database after they were flushed, up to flush_interval seconds later.
+    """
+
+    def __init__(self, collection, document_id:str="C1", flush_interval:float=5, shards:int=8) -> None:
+        self.collection = collection
+        self.document_id = document_id
+        self.flush_interval = flush_interval
+        self.shards = max(1, shards)
+        self._pending = {}
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    def increment(self, counters:dict) -> None:
+        with self._lock:
+            for counter, count in counters.items():
+                self._pending[counter] = self._pending.get(counter, 0) + count
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = Thread(target=self._run, name="activity-counter-flush", daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            self.collection.update_one({"_id": self.shardId()}, {"$inc": pending}, upsert=True)
+        except Exception as e:
+            with self._lock:
+                for counter, count in pending.items():
+                    self._pending[counter] = self._pending.get(counter, 0) + count
+            print(f"📤 | Activity Error: unable to flush activity counters, they will be retried\n🚧 | {e}\n")
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval)
+        self.flush()
+
+    def shardId(self) -> str:
+        return f"{self.document_id}:{hash((os.getpid(), get_ident())) % self.shards}"
+
+    def totals(self) -> dict:
+        """
+        Summary of the totals Function:
+            The totals function reads the current value of every counter, summed over all the shard documents.
+
+        Function Steps:
+            1. Match Documents: Matches the legacy "C1" document and every "C1:<n>" shard document.
+            2. Sum Counters: Groups them into one document that sums every counter path of COUNTERS.
+            3. Rebuild Counters: Turns the summed values back into the nested account_views / account_modifications layout.
+
+        Returns:
+            dict: The summed counters, e.g. {"account_creations": 12, "account_views": {"username": 3, ...}, "account_modifications": {...}}.
+
+        Notes:
+            Counts that are still pending in a process (not flushed yet) aren't included.
+        """
+        ids = [self.document_id] + [f"{self.document_id}:{shard}" for shard in range(self.shards)]
+        group = {"_id": None}
+        for counter in COUNTERS:
+            group[counter.replace(".", "__")] = {"$sum": "$" + counter}
+        summed = next(self.collection.aggregate([{"$match": {"_id": {"$in": ids}}}, {"$group": group}]), {})
+        totals = {"account_creations": summed.get("account_creations", 0), "account_views": {}, "account_modifications": {}}
+        for counter in COUNTERS[1:]:
+            section, field = counter.split(".")
+            totals[section][field] = summed.get(counter.replace(".", "__"), 0)
+        return totals
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+
+# Shared counters of the "C1" activity documents, the flush interval & number of shards can be tuned from the .env file
+activity_counter = ActivityCounter(activity_collection, "C1", float(config.get('activity_flush_interval') or 5), int(config.get('activity_shards') or 8))
@@ -0,0 +1,253 @@
+import asyncio
+from threading import Lock
+from pymongo import ReturnDocument, errors
+from db_module import config, getDatabaseName, poolOptions
+from activity import activity_counter
+from cache import user_cache
+from events import login_events
+from bloom import username_filter
+from sessions import session_manager
+from classes import User, _COUNTER_NAMES, _CONDITIONAL_FIELDS, _FIELDS, _prepareAccount, _prepareUpdate, _revokeSessions
+from hashing import hashPasswordAsync, runHashing, verifyPasswordAsync
+from records import UserRecord
+from schema import INDEXES
+from ratelimit import MemoryBackend, rate_limit_backend, signup_source_limiter
+from service import RateLimitedError, loginRetryAfter, loginUsername
+from validation import normalize_username
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:  # motor is only needed by the async API
+    AsyncIOMotorClient = None
+
+_client = None
+_client_lock = Lock()
+_indexes = None
+
+
+def getAsyncClient():
+    """
+    Return the shared motor (asyncio) client, creating it on first use.
+
+    Steps:
+    1. If the client already exists, return it.
+    2. Otherwise, create an AsyncIOMotorClient with the same connection string and pool options as the sync client (see db_module.poolOptions()).
+
+    Returns:
+        AsyncIOMotorClient: The shared asyncio client.
+
+    Raises:
+        ImportError: If motor isn't installed (pip install -r requirements.txt).
+        ConnectionFailure: If the connection string is missing from the .env file.
+
+    Notes:
+    - Creating the client doesn't block, motor connects in the background and the first awaited query waits for it.
+    - The declared indexes are created by the first awaited call of this module (see _bootstrap()), so an async-only deployment doesn't rely on the sync client to get its unique "username" index.
+    """
+    global _client
+    if _client is None:
+        if AsyncIOMotorClient is None:
+            raise ImportError("motor is required by the async authentication API, install it with: pip install motor")
+        with _client_lock:
+            if _client is None:
+                if not config.get('database_connection_string'):
+                    raise errors.ConnectionFailure("the database connection string is missing from the .env file")
+                _client = AsyncIOMotorClient(config['database_connection_string'], **poolOptions())
+    return _client
+
+
+def _users():
+    return getAsyncClient()[getDatabaseName()]['users']
+
+
+async def _bootstrap() -> None:
+    # Creates the declared indexes once per event loop, the next calls only await the finished task
+    global _indexes
+    loop = asyncio.get_running_loop()
+    if _indexes is None or _indexes.get_loop() is not loop:
+        _indexes = loop.create_task(_ensureIndexes(getAsyncClient()[getDatabaseName()]))
+    await asyncio.shield(_indexes)
+
+
+async def _ensureIndexes(database) -> None:
+    # The async counterpart of db_module._bootstrap(), create_index is a no-op for an index that already exists as declared
+    for spec in INDEXES:
+        try:
+            await database[spec.collection].create_index(spec.keys, name=spec.name, **spec.options)
+        except errors.PyMongoError as e:
+            print(f"📤 | Index Error: {spec.collection}.{spec.name} couldn't be created\n🚧 | {e}\n")
+
+
+async def login(username:str, password:str, source:str=None) -> dict:
+    """
+    Summary of the login Function:
+        The async counterpart of AuthService.login(), it verifies a username & password pair with one projected find_one, without blocking the event loop. Password hashing runs in the hashing thread pool, and outdated hashes are transparently rehashed.
+
+    Parameters:
+        username (str): The provided username.
+        password (str): The provided password.
+        source (str): Where the attempt comes from (e.g. a client IP), it is rate limited and recorded with the attempt in the login event log.
+
+    Returns:
+        dict: A result with the "verified" (bool), "status" ("verified", "unknown_user", "incorrect_password", "inactive" or "rate_limited") and "record_id" keys, plus the session "token" when verified (see sessions.py) and "retry_after" (seconds) when rate limited.
+    """
+    username = loginUsername(username)
+    retry_after = await _rateLimit(loginRetryAfter, username, source)
+    if retry_after:
+        result = {"verified": False, "status": "rate_limited", "record_id": None, "retry_after": retry_after}
+    else:
+        result = await _verify(username, password)
+    login_events.record(result['record_id'], username, result['status'], source)
+    return result
+
+
+async def _rateLimit(function, *args) -> float:
+    # The in-memory limiters answer right away, the shared one (MongoBackend) uses the synchronous client, off the event loop
+    if isinstance(rate_limit_backend, MemoryBackend):
+        return function(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+async def _verify(username:str, password:str) -> dict:
+    await _bootstrap()
+    record = None
+    if username is not None and username_filter.mightExist(username):
+        record = await _users().find_one({"username": username}, {"username": 1, "password": 1, "account_state": 1})
+    if record is None:
+        return {"verified": False, "status": "unknown_user", "record_id": None}
+    verified, needs_rehash = await verifyPasswordAsync(password, record['password'])
+    if not verified:
+        return {"verified": False, "status": "incorrect_password", "record_id": record['_id']}
+    elif record.get('account_state', True) == False:
+        return {"verified": False, "status": "inactive", "record_id": record['_id']}
+    else:
+        if needs_rehash:
+            try:
+                await _users().update_one({"_id": record['_id'], "password": record['password']}, {"$set": {"password": await hashPasswordAsync(password)}})
+                user_cache.invalidate(record['_id'])
+            except errors.PyMongoError:
+                pass
+        # The mongo session store writes the session with the synchronous client, off the event loop
+        if session_manager.collection is None:
+            token = session_manager.issue(record['_id'])
+        else:
+            token = await asyncio.get_running_loop().run_in_executor(None, session_manager.issue, record['_id'])
+        return {"verified": True, "status": "verified", "record_id": record['_id'], "token": token}
+
+
+async def create_account(username:str, password:str, first_name:str, last_name:str, dob:str, gender:str, role:str="user", source:str=None) -> str:
+    """
+    Summary of the create_account Function:
+        The async counterpart of the User class constructor, it validates the new account details and inserts the user record.
+
+    Parameters:
+        username, password, first_name, last_name, dob, gender, role: The details of the new account, dob in the format YYYY-MM-DD.
+        source (str): Where the signup comes from (e.g. a client IP), it is rate limited.
+
+    Function Steps:
+        0. Rate Limit: Rejects the signup if its source went over its limit (see ratelimit.py).
+        1. Details Validation: Validates the details with the create_new_account rules and hashes the password in the hashing thread pool, without contacting the database.
+        2. Insert Record: Inserts the user record through User.insert off the event loop, like every other signup (username filter, cache & account creations count), the unique "username" index rejects a taken username.
+
+    Returns:
+        str: The record ID of the new account.
+
+    Raises:
+        ValueError: Raised if any detail is invalid, or if the username is already registered.
+        RateLimitedError: Raised if too many signups came from the source.
+    """
+    retry_after = await _rateLimit(signup_source_limiter.hit, source) if source is not None else 0
+    if retry_after:
+        raise RateLimitedError(f"too many signups, retry in {retry_after:.0f} seconds", retry_after)
+    user = await runHashing(_prepareAccount, username, password, first_name, last_name, dob, gender, role)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, User.insert, user)
+    except errors.DuplicateKeyError:
+        raise ValueError(f"username '{user.username}' is already registered")
+
+
+class AsyncUser:
+    """
+    Summary of the AsyncUser Class:
+        The AsyncUser class is the async counterpart of the User class record functions. It shares the same validation rules, user_cache and activity_counter, but it doesn't print anything: an invalid value raises a ValueError and an unknown record ID returns None.
+        Like User.setGender and User.setState, an update of only the gender and/or account state is conditional: it returns None, without counting it or revoking any session, if the record already holds the new values.
+
+    Methods:
+        get: Retrieves several fields of a record in one query.
+        update: Applies several field changes to a record in one write.
+        getUsername, getPassword, getFirstName, getLastName, getDOB, getGender, getRole, getState, getComment: Retrieve one field, built on top of get.
+        setUsername, setPassword, setFirstName, setLastName, setDOB, setGender, setRole, setState, setComment: Update one field, built on top of update.
+    """
+
+    async def get(record_id:str, fields:list=None):
+        if fields is None:
+            fields = _FIELDS
+        if len(fields) == 0 or any(field not in _FIELDS for field in fields):
+            raise ValueError(f"fields must be some of the following: {_FIELDS}")
+        user = user_cache.get(record_id)
+        if user is None:
+            await _bootstrap()
+            document = await _users().find_one({"_id": record_id})
+            if document is None:
+                return None
+            user = UserRecord.from_document(document)
+            user_cache.put(user)
+        activity_counter.increment({"account_views." + _COUNTER_NAMES.get(field, field): 1 for field in fields})
+        return {field: user.get(field) for field in fields}
+
+    async def update(record_id:str, **fields):
+        if "password" in fields:
+            update, counters = await runHashing(_prepareUpdate, fields)
+        else:
+            update, counters = _prepareUpdate(fields)
+        if "username" in fields:
+            await asyncio.get_running_loop().run_in_executor(None, username_filter.add, normalize_username(fields['username']))
+        await _bootstrap()
+        if fields and all(field in _CONDITIONAL_FIELDS for field in fields):
+            # Like User.setGender & User.setState, only a record with a different value is updated, and only the changed fields are counted
+            values = update["$set"]
+            before = await _users().find_one_and_update({"_id": record_id, "$or": [{field: {"$ne": value}} for field, value in values.items()]}, update, projection={field: 1 for field in fields})
+            if before is None:
+                return None
+            fields = {field: value for field, value in values.items() if before.get(field) != value}
+            counters = {"account_modifications." + _COUNTER_NAMES.get(field, field): 1 for field in fields}
+            user = dict(values)
+        else:
+            try:
+                user = await _users().find_one_and_update({"_id": record_id}, update, projection={field: 1 for field in fields}, return_document=ReturnDocument.AFTER)
+            except errors.DuplicateKeyError:
+                raise ValueError("this username is already registered")
+            if user is None:
+                return None
+        activity_counter.increment(counters)
+        user_cache.invalidate(record_id)
+        if session_manager.collection is None:
+            _revokeSessions(record_id, fields)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, _revokeSessions, record_id, fields)
+        user.pop("_id", None)
+        return user
+
+
+def _getter(field:str):
+    async def getter(record_id:str):
+        user = await AsyncUser.get(record_id, [field])
+        if user is not None:
+            return user[field]
+    getter.__doc__ = f"Retrieve the {field} of a user record, see AsyncUser.get()."
+    return staticmethod(getter)
+
+
+def _setter(field:str):
+    async def setter(record_id:str, value):
+        user = await AsyncUser.update(record_id, **{field: value})
+        if user is not None:
+            # Like the User setters, the new password is returned rather than its stored hash
+            return value if field == "password" else user[field]
+    setter.__doc__ = f"Update the {field} of a user record, see AsyncUser.update()."
+    return staticmethod(setter)
+
+
+for _name, _field in (("Username", "username"), ("Password", "password"), ("FirstName", "first_name"), ("LastName", "last_name"), ("DOB", "dob"), ("Gender", "gender"), ("Role", "role"), ("State", "account_state"), ("Comment", "comment")):
+    setattr(AsyncUser, "get" + _name, _getter(_field))
+    setattr(AsyncUser, "set" + _name, _setter(_field))
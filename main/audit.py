@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
+from db_module import users_collection
+from hashing import verifyPassword
+from validation import normalize_username
+
+
+def verify_many(pairs:list, batch_size:int=10000, workers:int=None, users=users_collection) -> list:
+    """
+    This "Block" verifies many (username, password) pairs at once, e.g. for a nightly credential audit. It never modifies the records.
+
+    In Detail:
+        1. The pairs are processed in batches of batch_size, and the records of each batch are fetched with a single "$in" query on the "username" index, projected to the fields the verification needs.
+        2. The password comparisons (including the key-derivation hashing) are fanned out over a ProcessPoolExecutor, so they run on all cores instead of being capped by the GIL.
+        3. A result is returned for every pair, in the same order.
+
+    Parameters:
+        pairs (list): The (username, password) pairs to verify.
+        batch_size (int): Number of pairs fetched per query (default is 10000).
+        workers (int): Number of worker processes (default is the number of CPUs).
+        users: The users collection (default is db_module.users_collection).
+
+    Returns:
+        list: One dict per pair, with the "username", "verified" (bool) and "status" ("verified", "unknown_user", "incorrect_password" or "inactive") keys.
+
+    Raises:
+        PyMongoError: Raised if the database can't be reached.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            records = {}
+            usernames = [normalize_username(username) for username, password in batch]
+            for record in users.find({"username": {"$in": list(set(usernames))}}, {"username": 1, "password": 1, "account_state": 1}):
+                records[record['username']] = record
+            checks = [(index, password, records[usernames[index]]['password']) for index, (username, password) in enumerate(batch) if usernames[index] in records]
+            verified = {}
+            chunksize = max(1, len(checks) // ((workers or 4) * 4))
+            for (index, password, encoded), outcome in zip(checks, executor.map(verifyPassword, [check[1] for check in checks], [check[2] for check in checks], chunksize=chunksize)):
+                verified[index] = outcome[0]
+            for index, (username, password) in enumerate(batch):
+                record = records.get(usernames[index])
+                if record is None:
+                    status = "unknown_user"
+                elif not verified[index]:
+                    status = "incorrect_password"
+                elif record.get('account_state', True) == False:
+                    status = "inactive"
+                else:
+                    status = "verified"
+                results.append({"username": username, "verified": status == "verified", "status": status})
+    return results
@@ -0,0 +1,306 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from pymongo import MongoClient, monitoring, uri_parser
+import db_module
+import hashing
+from hashing import PBKDF2Hasher, hashPassword, setHasher
+from ids import generateIDs
+from validation import validate_record
+
+try:
+    import mongomock
+except ImportError:  # mongomock is only needed by the in-process target
+    mongomock = None
+
+# Collection methods that cost one round trip, counted on the in-process target
+_OPERATIONS = {"find_one", "find", "insert_one", "insert_many", "update_one", "update_many", "find_one_and_update", "bulk_write", "delete_one", "delete_many", "aggregate", "count_documents", "estimated_document_count", "index_information", "create_index"}
+# Commands that aren't application round trips (connection handshake & authentication)
+_IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "buildInfo", "endSessions"}
+WORKLOADS = ["login", "signup", "get", "set"]
+PASSWORD = "benchmark-password"
+
+_round_trips = threading.local()
+
+
+def _countRoundTrip() -> None:
+    _round_trips.count = getattr(_round_trips, "count", 0) + 1
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Count the commands sent to mongod by the calling thread, pymongo calls the listener on the thread that runs the command."""
+
+    def started(self, event) -> None:
+        if event.command_name not in _IGNORED_COMMANDS:
+            _countRoundTrip()
+
+    def succeeded(self, event) -> None:
+        pass
+
+    def failed(self, event) -> None:
+        pass
+
+
+class _CountingCollection:
+    # Wraps a mongomock collection, every call of a database operation counts as one round trip
+    def __init__(self, collection) -> None:
+        self._collection = collection
+
+    def __getattr__(self, attribute:str):
+        value = getattr(self._collection, attribute)
+        if attribute in _OPERATIONS:
+            def operation(*args, **kwargs):
+                _countRoundTrip()
+                return value(*args, **kwargs)
+            return operation
+        return value
+
+
+class _CountingDatabase:
+    def __init__(self, database) -> None:
+        self._database = database
+
+    def __getitem__(self, name:str):
+        return _CountingCollection(self._database[name])
+
+    def __getattr__(self, attribute:str):
+        return getattr(self._database, attribute)
+
+
+class _CountingClient:
+    def __init__(self, client) -> None:
+        self._client = client
+
+    def __getitem__(self, name:str):
+        return _CountingDatabase(self._client[name])
+
+    def __getattr__(self, attribute:str):
+        return getattr(self._client, attribute)
+
+
+def connect(target:str, uri:str=None, database_name:str="authenticator_benchmark"):
+    """
+    Point every collection of db_module to the benchmark database, and return the client.
+
+    Parameters:
+        target (str): "mongod" for a (local, scratch) mongod reached with uri, or "mock" for an in-process mongomock client.
+        uri (str): The mongod connection string (default is the database_connection_string of the .env file).
+        database_name (str): The database used by the benchmark, it is dropped first.
+
+    Raises:
+        ValueError: Raised if database_name is the application database, or the default database of the configured or provided connection string.
+    """
+    protected = {"authenticator", db_module.getDatabaseName()}
+    for connection_string in (db_module.config.get('database_connection_string'), uri):
+        if connection_string:
+            protected.add(uri_parser.parse_uri(connection_string).get('database'))
+    if database_name in protected:
+        raise ValueError(f"the benchmark drops its database, '{database_name}' is an application database")
+    if target == "mock":
+        if mongomock is None:
+            raise ImportError("mongomock is required by the in-process target, install it with: pip install mongomock")
+        client = _CountingClient(mongomock.MongoClient())
+    else:
+        client = MongoClient(uri or db_module.config.get('database_connection_string') or "mongodb://localhost:27017", event_listeners=[RoundTripCounter()], **db_module.poolOptions())
+    client.drop_database(database_name)
+    db_module.setClient(client, database_name)
+    return client
+
+
+def seed(users:int, batch_size:int=10000) -> list:
+    """
+    Insert users benchmark accounts with unordered insert_many batches, and return their record IDs.
+
+    All the accounts share one password hash (hashed once with the current hasher), so seeding 1M users isn't bound by hashing.
+    """
+    from classes import _accountRecord
+    password_hash = hashPassword(PASSWORD)
+    values = validate_record({"username": "benchmark", "password": PASSWORD, "first_name": "Bench", "last_name": "Mark", "dob": "1990-1-1", "gender": "female"})
+    collection = db_module.getDatabase()['users']
+    record_ids = []
+    for start in range(0, users, batch_size):
+        count = min(batch_size, users - start)
+        ids = generateIDs(count)
+        documents = []
+        for offset, record_id in enumerate(ids):
+            values['username'] = f"bench{start + offset:07d}"
+            documents.append(_accountRecord(values, password_hash, record_id).to_document())
+        collection.insert_many(documents, ordered=False)
+        record_ids.extend(ids)
+    return record_ids
+
+
+def _percentile(latencies:list, percentile:float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))] if latencies else 0.0
+
+
+def run(name:str, operation, operations:int, concurrency:int) -> dict:
+    """
+    Run an operation operations times over concurrency threads, and return its throughput, latency percentiles (in milliseconds) and round trips per operation.
+
+    The operation receives the index of the call, an operation that raises is counted in "errors".
+    """
+    latencies = [None] * operations
+    errors = [0] * concurrency
+    round_trips = [0] * concurrency
+
+    def worker(thread:int) -> None:
+        _round_trips.count = 0
+        for index in range(thread, operations, concurrency):
+            started = perf_counter()
+            try:
+                operation(index)
+            except Exception:
+                errors[thread] += 1
+            latencies[index] = perf_counter() - started
+        round_trips[thread] = _round_trips.count
+
+    started = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    duration = perf_counter() - started
+    latencies = sorted(latency * 1000 for latency in latencies)
+    return {
+        "workload": name,
+        "operations": operations,
+        "concurrency": concurrency,
+        "errors": sum(errors),
+        "seconds": round(duration, 4),
+        "throughput": round(operations / duration, 2) if duration else None,
+        "latency_ms": {"mean": round(sum(latencies) / len(latencies), 4) if latencies else 0.0, "p50": round(_percentile(latencies, 0.50), 4), "p95": round(_percentile(latencies, 0.95), 4), "p99": round(_percentile(latencies, 0.99), 4)},
+        "round_trips_per_op": round(sum(round_trips) / operations, 3) if operations else 0.0,
+    }
+
+
+def benchmark(target:str="mock", users:int=10000, operations:int=10000, concurrency:int=8, workloads:list=WORKLOADS, unknown_ratio:float=0.0, fast_hash:bool=True, uri:str=None, database_name:str="authenticator_benchmark", seed_value:int=0) -> dict:
+    """
+    Summary of the benchmark Function:
+        The benchmark function measures the login, signup, get and set flows against a scratch database, so their cost can be tracked over time.
+
+    Parameters:
+        target (str): "mock" (in-process mongomock, the default) or "mongod".
+        users (int): Number of accounts seeded before the workloads run (e.g. 10000, 100000 or 1000000).
+        operations (int): Number of operations per workload.
+        concurrency (int): Number of threads running each workload.
+        workloads (list): The workloads to run, some of WORKLOADS.
+        unknown_ratio (float): Share of the logins made with a username that doesn't exist.
+        fast_hash (bool): Hash passwords with a cheap PBKDF2 hasher instead of the configured one, so the database path isn't hidden behind the key derivation (default is True).
+        uri, database_name: See connect().
+        seed_value (int): Seed of the random picks, so two runs make the same requests.
+
+    Function Steps:
+        1. Connect: Points db_module to the scratch database (dropped first) and runs the startup bootstrap on it.
+        2. Seed: Inserts the accounts, and builds the username filter from them.
+        3. Run Workloads: Runs every workload with the AuthService & User classes, the real code paths, with their prints silenced.
+        4. Report: Returns the settings and one result per workload (see run()).
+
+    Notes:
+        - The login & signup rate limits are lifted for the run, the benchmark would otherwise measure the lockouts.
+        - The username filter isn't persisted, so a benchmark never replaces the production filter file.
+        - Everything the run changes is restored afterwards: the hasher, the limits, the username filter, the db_module client. The buffered login events & activity counters are flushed to the scratch database first, and the user cache is cleared.
+    """
+    from bloom import username_filter
+    from cache import user_cache
+    from classes import User
+    from ratelimit import login_source_limiter, login_user_limiter, signup_source_limiter
+    from service import AuthService
+    from activity import activity_counter
+    from events import login_events
+    random_picks = random.Random(seed_value)
+    limiters = (login_user_limiter, login_source_limiter, signup_source_limiter)
+    previous = {"hasher": hashing.current_hasher, "limits": [limiter.limit for limiter in limiters], "filter": username_filter.snapshot(), "client": db_module.currentClient(), "database_name": db_module.getDatabaseName()}
+    configured_hasher = type(hashing.current_hasher).__name__
+    try:
+        if fast_hash:
+            setHasher(PBKDF2Hasher(1000))
+        for limiter in limiters:
+            limiter.limit = float("inf")
+        username_filter.path = None
+        # Pending application events & counters are written to the application database before the client is switched
+        login_events.flush()
+        activity_counter.flush()
+        connect(target, uri, database_name)
+        started = perf_counter()
+        record_ids = seed(users)
+        username_filter.build()
+        seeded = perf_counter() - started
+        service = AuthService()
+        results = []
+        for workload in workloads:
+            user_cache.clear()
+            if workload == "login":
+                picks = [f"bench{random_picks.randrange(users):07d}" if random_picks.random() >= unknown_ratio else f"unknown{index:07d}" for index in range(operations)]
+                operation = lambda index: service.login(picks[index], PASSWORD)
+            elif workload == "signup":
+                operation = lambda index: service.register(f"signup{index:07d}", PASSWORD, "Bench", "Mark", "1990-1-1", "male")
+            elif workload == "get":
+                picks = [random_picks.choice(record_ids) for _ in range(operations)]
+                operation = lambda index: User.get(picks[index], ["first_name", "last_name", "role"])
+            elif workload == "set":
+                picks = [random_picks.choice(record_ids) for _ in range(operations)]
+                operation = lambda index: User.setFirstName(picks[index], f"Name{index % 1000:03d}")
+            else:
+                raise ValueError(f"workload must be some of the following: {WORKLOADS}")
+            result = run(workload, operation, operations, concurrency)
+            if workload == "get":
+                result['cache'] = user_cache.stats()
+            results.append(result)
+    finally:
+        # The scratch data must not reach the application database once the client is restored
+        if db_module.getDatabaseName() == database_name:
+            login_events.flush()
+            activity_counter.flush()
+        user_cache.clear()
+        # Waits for a background catch-up of the scratch filter, so it can't land after the restore
+        username_filter.restore(previous['filter'])
+        db_module.setClient(previous['client'], previous['database_name'])
+        for limiter, limit in zip(limiters, previous['limits']):
+            limiter.limit = limit
+        setHasher(previous['hasher'])
+    return {
+        "target": target,
+        "users": users,
+        "operations": operations,
+        "concurrency": concurrency,
+        "unknown_ratio": unknown_ratio,
+        "hasher": "pbkdf2_sha256 (1000 iterations)" if fast_hash else configured_hasher,
+        "seed_seconds": round(seeded, 4),
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the login, signup, get and set flows against a scratch mongod or an in-process mock.")
+    parser.add_argument("--target", choices=["mock", "mongod"], default="mock", help="in-process mongomock (default) or a local mongod")
+    parser.add_argument("--uri", help="mongod connection string (default is the one of the .env file)")
+    parser.add_argument("--database", default="authenticator_benchmark", help="scratch database, it is dropped first (default is authenticator_benchmark)")
+    parser.add_argument("--users", type=int, default=10000, help="accounts seeded before the run, e.g. 10000, 100000 or 1000000")
+    parser.add_argument("--operations", type=int, default=10000, help="operations per workload")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads per workload")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help=f"comma separated workloads (default is {','.join(WORKLOADS)})")
+    parser.add_argument("--unknown-ratio", type=float, default=0.0, help="share of the logins made with an unknown username")
+    parser.add_argument("--real-hash", action="store_true", help="hash with the configured hasher instead of a cheap one")
+    parser.add_argument("--output", help="write the JSON report to this file instead of the standard output")
+    arguments = parser.parse_args()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = benchmark(arguments.target, arguments.users, arguments.operations, arguments.concurrency, arguments.workloads.split(","), arguments.unknown_ratio, not arguments.real_hash, arguments.uri, arguments.database)
+    except ValueError as v:
+        print(f"🔤 | Benchmark Error: {v}\n")
+        return
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        for result in report['results']:
+            print(f"📊 | {result['workload']}: {result['throughput']} op/s, p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, p99 {result['latency_ms']['p99']} ms, {result['round_trips_per_op']} round trip(s)/op, {result['errors']} error(s)")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import atexit
+import hashlib
+import math
+import os
+import struct
+from threading import Lock, Thread
+from datetime import datetime, timezone
+from time import monotonic, time
+from db_module import config, username_changes_collection, users_collection
+from ids import ULIDGenerator
+
+_HEADER = struct.Struct(">4sQIQQ")  # magic, bits, hashes, added, synced
+_MAGIC = b"UBF3"
+# Changes are read again for this many milliseconds before the last catch-up, it covers the clock skew between nodes and the writes in flight
+_OVERLAP_MS = 30000
+# Seconds a username change is kept before its TTL index removes it (see schema.py), a filter that fell further behind is rebuilt
+CHANGES_TTL = int(config.get('username_changes_ttl') or 86400)
+
+
+class BloomFilter:
+    """
+    Summary of the BloomFilter Class:
+        The BloomFilter class is a compact set of strings that answers "definitely not in the set" or "maybe in the set". It never forgets an added string, and only answers "maybe" for a missing string with the configured error rate.
+
+    Key Attributes:
+        bits: Number of bits of the filter, sized for the capacity and error rate.
+        hashes: Number of bit positions per string.
+        added: Number of strings added.
+        synced: The time (milliseconds since the epoch) the filter holds every username change until (see UsernameFilter).
+
+    Methods:
+        add: Adds a string.
+        __contains__: Returns False if the string was definitely never added.
+        save / load: Write the filter to a file, and read it back.
+
+    Notes:
+        - The positions are derived from one 128-bit blake2b digest split in two (double hashing), so a lookup costs one hash whatever the number of positions.
+    """
+
+    def __init__(self, capacity:int=100000, error_rate:float=0.001, bits:int=None, hashes:int=None) -> None:
+        capacity = max(1, capacity)
+        self.bits = bits or max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.added = 0
+        self.synced = 0
+        self._array = bytearray((self.bits + 7) // 8)
+        self._lock = Lock()
+
+    def add(self, value:str) -> None:
+        positions = self._positions(value)
+        with self._lock:
+            for position in positions:
+                self._array[position >> 3] |= 1 << (position & 7)
+            self.added += 1
+
+    def __contains__(self, value:str) -> bool:
+        array = self._array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def save(self, path:str) -> None:
+        # Written to a temporary file first, so a crash never leaves a truncated filter behind
+        with self._lock:
+            data = _HEADER.pack(_MAGIC, self.bits, self.hashes, self.added, self.synced) + bytes(self._array)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path:str):
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, bits, hashes, added, synced = _HEADER.unpack_from(data)
+        if magic != _MAGIC or len(data) != _HEADER.size + (bits + 7) // 8:
+            raise ValueError(f"{path} isn't a username filter file")
+        bloom = cls(bits=bits, hashes=hashes)
+        bloom.added, bloom.synced = added, synced
+        bloom._array[:] = data[_HEADER.size:]
+        return bloom
+
+    def _positions(self, value:str) -> list:
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return [(first + index * second) % self.bits for index in range(self.hashes)]
+
+
+class UsernameFilter:
+    """
+    Summary of the UsernameFilter Class:
+        The UsernameFilter class keeps a BloomFilter of every registered (canonical) username, so a login or availability check for a username that doesn't exist is answered in memory, without any database query. Only the possible hits reach the users collection.
+
+    Key Attributes:
+        users: The users collection (default is db_module.users_collection).
+        path: The file the filter is persisted to, so a restart doesn't rebuild it from scratch.
+        error_rate: The false positive rate the filter is sized for.
+        refresh_interval: Number of seconds between two background catch-ups with the username changes.
+        changes: The collection every registered or renamed username is inserted into (default is db_module.username_changes_collection).
+        max_staleness: Number of seconds a miss is trusted after the last successful catch-up (default is twice the refresh_interval).
+
+    Methods:
+        mightExist: Returns False if the username is definitely not registered.
+        add / addMany: Add usernames to this filter and insert them into the changes collection. They are called before every write that registers or renames a username, so the username is never rejected once the write is visible on this node, nor on the other nodes after their next catch-up.
+        build: Rebuilds the filter from a projected cursor over the usernames, and persists it.
+        save: Persists the filter.
+        snapshot / restore: Save and put back the filter, path & refresh state, e.g. around a benchmark run on a scratch database.
+
+    Notes:
+        - Every change is its own document, with a time-ordered ULID "_id" (see ids.py), so the writes of the nodes don't contend on one document. A TTL index removes them after CHANGES_TTL seconds.
+        - A background catch-up every refresh_interval seconds adds the changes published since the previous one, with one range query on "_id". The range starts _OVERLAP_MS earlier, so a change of a node with a late clock, or still in flight, isn't skipped. Only a filter that fell behind by more than CHANGES_TTL (e.g. restored from an old file) is rebuilt.
+        - A miss is only trusted if the last catch-up succeeded less than max_staleness seconds ago, otherwise the username "might exist" and is looked up in the users collection. A username registered on another node may thus be reported as unknown for up to max_staleness seconds, never longer.
+        - The filter is loaded (or built) in a background thread on first use, until it is ready every username "might exist", so no login is ever rejected by a filter that isn't ready.
+        - The filter is persisted at process exit, and after every build. The persisted sync time tells a restarted node which changes it still has to add.
+    """
+
+    def __init__(self, users=users_collection, path:str=None, error_rate:float=0.001, refresh_interval:float=5, changes=username_changes_collection, max_staleness:float=None) -> None:
+        self.users = users
+        self.path = path
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.changes = changes
+        self.max_staleness = max_staleness if max_staleness is not None else 2 * refresh_interval
+        self._filter = None
+        self._building = None
+        self._checked_at = float("-inf")
+        self._synced_at = float("-inf")
+        self._thread = None
+        self._lock = Lock()
+        self._ids = ULIDGenerator()
+        atexit.register(self.save)
+
+    def mightExist(self, username:str) -> bool:
+        now = monotonic()
+        if now - self._checked_at > self.refresh_interval:
+            self._refresh()
+        bloom = self._filter
+        if bloom is None or username in bloom:
+            return True
+        # A miss of a filter that couldn't catch up lately isn't trusted
+        return now - self._synced_at > self.max_staleness
+
+    def add(self, username:str) -> None:
+        self.addMany([username])
+
+    def addMany(self, usernames:list) -> None:
+        if not usernames:
+            return
+        with self._lock:
+            for username in usernames:
+                if self._building is not None:
+                    self._building.append(username)
+                if self._filter is not None:
+                    self._filter.add(username)
+        # Inserted before the users write, so a node that sees the write finds the username in its next catch-up
+        now = datetime.now(timezone.utc)
+        self.changes.insert_many([{"_id": change_id, "username": username, "created_at": now} for change_id, username in zip(self._ids.next_ids(len(usernames)), usernames)], ordered=False)
+
+    def build(self) -> BloomFilter:
+        self._startBuffering()
+        try:
+            started = int(time() * 1000)
+            bloom = BloomFilter(max(2 * self.users.estimated_document_count(), 100000), self.error_rate)
+            for record in self.users.find({}, {"_id": 0, "username": 1}).batch_size(10000):
+                if record.get('username') is not None:
+                    bloom.add(record['username'])
+            # The changes published just before the scan are added too, their users write may have landed behind the cursor
+            bloom.synced = started
+            self._catchUp(bloom)
+            self._swap(bloom)
+        finally:
+            self._building = None
+        self.save()
+        return bloom
+
+    def save(self) -> None:
+        if self._filter is not None and self.path:
+            try:
+                self._filter.save(self.path)
+            except OSError as e:
+                print(f"📤 | Filter Error: unable to save the username filter\n🚧 | {e}\n")
+
+    def snapshot(self) -> dict:
+        """Return the state of the filter (its BloomFilter, path & refresh state), to be put back with restore()."""
+        self.wait()
+        with self._lock:
+            return {"filter": self._filter, "path": self.path, "synced_at": self._synced_at}
+
+    def restore(self, state:dict) -> None:
+        """Put back a state returned by snapshot(), the next mightExist() catches up with the changes made meanwhile."""
+        self.wait()
+        with self._lock:
+            self._filter = state['filter']
+            self.path = state['path']
+            self._synced_at = state['synced_at']
+            self._building = None
+            self._checked_at = float("-inf")
+
+    def wait(self) -> None:
+        """Wait for the running background load, build or catch-up to finish."""
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _catchUp(self, bloom:BloomFilter) -> bool:
+        # Adds the usernames changed since the filter was synced, returns False if they may have expired already
+        started = int(time() * 1000)
+        if started - bloom.synced > CHANGES_TTL * 1000 - _OVERLAP_MS:
+            return False
+        since = self._ids.floor(max(0, bloom.synced - _OVERLAP_MS))
+        usernames = [change['username'] for change in self.changes.find({"_id": {"$gt": since}}, {"_id": 0, "username": 1})]
+        with self._lock:
+            for username in usernames:
+                bloom.add(username)
+            bloom.synced = max(bloom.synced, started)
+        return True
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._checked_at = monotonic()
+            self._thread = Thread(target=self._update, name="username-filter", daemon=True)
+            self._thread.start()
+
+    def _update(self) -> None:
+        started = monotonic()
+        self._startBuffering()
+        try:
+            bloom = self._filter
+            if bloom is None and self.path and os.path.exists(self.path):
+                try:
+                    bloom = BloomFilter.load(self.path)
+                except (OSError, ValueError, struct.error):
+                    bloom = None
+            overfull = bloom is not None and bloom.added * -math.log(self.error_rate) / math.log(2) ** 2 > bloom.bits
+            if bloom is None or overfull:
+                self.build()
+            else:
+                if bloom is not self._filter:
+                    self._swap(bloom)
+                if not self._catchUp(bloom):
+                    self.build()
+            self._synced_at = started
+        except Exception as e:
+            print(f"📤 | Filter Error: unable to update the username filter, usernames are looked up in the database\n🚧 | {e}\n")
+        finally:
+            self._building = None
+            self._checked_at = monotonic()
+
+    def _startBuffering(self) -> None:
+        # Usernames added while a filter is being loaded or built are buffered, the cursor may have streamed past them
+        with self._lock:
+            if self._building is None:
+                self._building = []
+
+    def _swap(self, bloom:BloomFilter) -> None:
+        with self._lock:
+            for username in self._building or []:
+                bloom.add(username)
+            self._building = []
+            self._filter = bloom
+
+
+# Shared filter of the registered usernames, its file, refresh interval & staleness can be tuned from the .env file
+username_filter = UsernameFilter(users_collection, config.get('username_filter_path') or "authenticator/main/side/usernames.bloom", float(config.get('username_filter_error_rate') or 0.001), float(config.get('username_filter_refresh_interval') or 5), username_changes_collection, float(config['username_filter_max_staleness']) if config.get('username_filter_max_staleness') else None)
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from db_module import config
+from records import UserRecord
+
+
+class RecordCache:
+    """
+    Summary of the RecordCache Class:
+        The RecordCache class is an in-process, bounded LRU cache with a time-to-live (TTL) for user records. It sits in front of the users_collection reads so hot records are served without a database round trip.
+
+    Key Attributes:
+        max_size: Maximum number of records kept in the cache, the least recently used record is evicted first.
+        ttl: Number of seconds a record stays valid after it was cached.
+        hits / misses / evictions: Counters of cache lookups that were served, lookups that weren't, and records that were evicted (because of the size bound or an expired TTL).
+
+    Methods:
+        get: Returns a cached record by its ID, or None.
+        getByUsername: Returns a cached record by its username, or None.
+        put: Caches a full UserRecord under its ID and its username.
+        invalidate: Removes a record by its ID and/or username, it must be called by every write to the users_collection.
+        clear: Removes every record.
+        stats: Returns the cache counters.
+
+    Notes:
+        - Records are keyed by "_id", and a secondary index maps each username to its "_id".
+        - The records are immutable UserRecord instances (see records.py), so they are returned without copies and take far less memory than the fetched dicts.
+        - The cache is shared across threads, every operation is guarded by a lock.
+    """
+
+    def __init__(self, max_size:int=10000, ttl:float=60) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._records = OrderedDict()
+        self._usernames = {}
+        self._lock = Lock()
+
+    def get(self, record_id:str):
+        with self._lock:
+            return self._lookup(record_id)
+
+    def getByUsername(self, username:str):
+        with self._lock:
+            record_id = self._usernames.get(username)
+            if record_id is None:
+                self.misses += 1
+                return None
+            return self._lookup(record_id)
+
+    def put(self, record:UserRecord) -> None:
+        with self._lock:
+            self._remove(record.id)
+            self._records[record.id] = (monotonic() + self.ttl, record)
+            if record.username is not None:
+                self._usernames[record.username] = record.id
+            while len(self._records) > self.max_size:
+                self._remove(next(iter(self._records)))
+                self.evictions += 1
+
+    def invalidate(self, record_id:str=None, username:str=None) -> None:
+        with self._lock:
+            if record_id is not None:
+                self._remove(record_id)
+            if username is not None and username in self._usernames:
+                self._remove(self._usernames[username])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._usernames.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._records), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _lookup(self, record_id:str):
+        entry = self._records.get(record_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] < monotonic():
+            self._remove(record_id)
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._records.move_to_end(record_id)
+        self.hits += 1
+        return entry[1]
+
+    def _remove(self, record_id:str) -> None:
+        entry = self._records.pop(record_id, None)
+        if entry is not None and self._usernames.get(entry[1].username) == record_id:
+            del self._usernames[entry[1].username]
+
+
+# Shared cache of the users_collection records, its size & TTL can be tuned from the .env file
+user_cache = RecordCache(int(config.get('cache_max_size') or 10000), float(config.get('cache_ttl') or 60))
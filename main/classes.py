@@ -1,17 +1,31 @@
-from db_module import users_collection, activity_collection
-from uuid import uuid4
-from datetime import datetime
+from db_module import users_collection
+from activity import activity_counter
+from cache import user_cache
+from bloom import username_filter
+from sessions import session_manager
+from records import UserRecord
+from hashing import hashPassword
+from ids import generateID
+from validation import ACCOUNT_FIELDS, FieldValidationError, normalize_username, validate, validate_record
+from pymongo import ReturnDocument, UpdateOne, errors
+
+# activity_collection counter names of the record fields that don't share the field's name
+_COUNTER_NAMES = {"account_state": "state"}
+# Record fields that can be retrieved or updated
+_FIELDS = ["username", "password", "first_name", "last_name", "dob", "gender", "role", "account_state", "comment"]
+# Record fields whose setters (setGender, setState) only update a record holding a different value
+_CONDITIONAL_FIELDS = ("gender", "account_state")
 
  
 class User:
     """
     Summary of the User Class:
-        The User class is designed to create a user profile with specified attributes such as username, password, first name, last name, date of birth, and gender. It generates a unique ID for each user using the current date and a UUID. The class also handles the insertion of the user record into a MongoDB collection and updates an activity log to track account creations.
+        The User class is designed to create a user profile with specified attributes such as username, password, first name, last name, date of birth, and gender. It generates a unique, time-ordered ID for each user (see ids.py). The class also handles the insertion of the user record into a MongoDB collection and updates an activity log to track account creations.
 
     Key Attributes:
         id: Unique identifier for the user.
-        username: Lowercased username of the user.
-        password: User's password.
+        username: Canonical (lowercased) username of the user, see validation.normalize_username.
+        password: User's password hash (see hashing.py), the plaintext password is never stored.
         first_name: Capitalized first name of the user.
         last_name: Capitalized last name of the user.
         dob: Date of birth formatted as YYYY-MM-DD.
@@ -19,51 +33,150 @@ class User:
         role: Role of the user (default is "user").
         account_state: Boolean indicating if the account is active (default is True).
         comment: Additional comments about the user.
+        record: The inserted UserRecord (see records.py).
         
     Methods:
-        init: Initializes the user instance with provided details, generates a unique ID, and inserts the user record into the users_collection in MongoDB..
-    If the insertion is successful, it updates the activity log in activity_collection and prints the record ID.
+        init: Validates the provided details with the create_new_account rules (see validation.py), generates a unique ID, and inserts the user record into the users_collection in MongoDB..
+    If a detail is invalid, it prints an incorrect value message and raises a FieldValidationError (a ValueError) without contacting the database. If the insertion is successful, it updates the activity log through the activity_counter (see activity.py) and prints the record ID. If the username is already registered, the unique "username" index rejects the insert and a ValueError is raised.
+        update / updateMany: Apply several validated field changes to one or many records in a single write.
+        get: Retrieves several fields of a record with one projected query, the get* functions are built on top of it.
+        getByUsername: Retrieves several fields of a record by its username.
+        fetch / fetchByUsername: Return the whole record as an immutable UserRecord (see records.py).
+        insert: Inserts a UserRecord built elsewhere, e.g. by the AuthService or async_auth.create_account.
+        insertMany: Inserts many UserRecord with one write, e.g. an importer.py batch, and reports the rejected ones.
+    User is a thin repository over the users_collection, the record itself is a UserRecord. Reads are served through the user_cache (see cache.py), and every write invalidates the cached record.
     """
 
     
     def __init__(self, inUsername:str, inPassword:str, inFName:str, inLName:str, inDOB:str, inGender:str, role="user") -> None:
-        getDate = datetime.today()
-        generateUUID = str(uuid4()).upper()
-        generateID = str(str(getDate.year) + str(getDate.month) + str(getDate.day) + "1" + (generateUUID[-12:-1]))
-        filteredDate = inDOB.split("-")
-        self.id = generateID
-        self.username = inUsername.lower()
-        self.password = inPassword
-        self.first_name = inFName.capitalize()
-        self.last_name = inLName.capitalize()
-        self.dob = filteredDate[0]+ "-" + filteredDate[1] + "-" + filteredDate[2]
-        self.gender = inGender.capitalize()
-        self.role = role.lower()
-        self.account_state = True
-        self.comment = ""
         try:
-            user = {
-                    "_id": self.id,
-                    "username": self.username,
-                    "password": self.password,
-                    "first_name": self.first_name,
-                    "last_name": self.last_name,
-                    "dob": datetime.strptime(f"{self.dob}", "%Y-%m-%d"),
-                    "gender": self.gender,
-                    "role": self.role,
-                    "account_state": self.account_state,
-                    "comment": self.comment
-                }
+            self.record = _prepareAccount(inUsername, inPassword, inFName, inLName, inDOB, inGender, role)
+        except FieldValidationError as f:
+            print(f"🔤 | Incorrect Value: {f}\n")
+            raise
+        self.id = self.record.id
+        self.username = self.record.username
+        self.password = self.record.password
+        self.first_name = self.record.first_name
+        self.last_name = self.record.last_name
+        self.dob = self.record.dob.strftime("%Y-%m-%d")
+        self.gender = self.record.gender
+        self.role = self.record.role
+        self.account_state = self.record.account_state
+        self.comment = self.record.comment
+        try:
             print("🔃 | Inserting record..\n")
-            users_collection.insert_one(user)
+            User.insert(self.record)
+        except errors.DuplicateKeyError:
+            print("⚠️ | Existing Username: this username is already registered..\n")
+            raise ValueError(f"username '{self.username}' is already registered")
         except Exception as e:
             print(f"📤 | Insertion Error: unable to insert record\n🚧 | {e}\n")
         else:
             print("✅ | Insertion completed\n")
-            activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_creations": 1}})
-            user = users_collection.find({"_id": self.id})
-            for i in user:
-                print("Your record ID number is:", i['_id'],"\n")
+            print("Your record ID number is:", self.id,"\n")
+
+
+    def insert(record:UserRecord, users=users_collection, usernames=username_filter) -> str:
+        """
+        Summary of the insert Function:
+            The insert function inserts a new user record into the users_collection, without any message. It is used by the User constructor, AuthService.register and async_auth.create_account, see insertMany.
+
+        Parameters:
+            record (UserRecord): The record to be inserted, already validated and with its password hashed.
+            users: The users collection (default is db_module.users_collection).
+            usernames: The username filter the username is published to (default is bloom.username_filter).
+
+        Returns:
+            str: The record ID.
+
+        Raises:
+            DuplicateKeyError: Raised by the unique "username" index if the username is already registered.
+            WriteError: Raised if the record was rejected for another reason.
+        """
+        for error in User.insertMany([record], users, usernames):
+            raise (errors.DuplicateKeyError if error.get('code') == 11000 else errors.WriteError)(error.get('errmsg', ""), error.get('code'), error)
+        return record.id
+
+    def insertMany(records:list, users=users_collection, usernames=username_filter) -> list:
+        """
+        Summary of the insertMany Function:
+            The insertMany function inserts new user records into the users_collection with one unordered insert_many, without any message. It is the only place accounts are created, used by insert and by importer.py for every batch.
+
+        Parameters:
+            records (list): The UserRecord to be inserted, already validated and with their passwords hashed.
+            users: The users collection (default is db_module.users_collection).
+            usernames: The username filter the usernames are published to (default is bloom.username_filter).
+
+        Function Steps:
+            1. Publish Usernames: Adds the usernames to the username filter before the write (see bloom.py).
+            2. Insert Records: Inserts every record with one unordered insert_many, a rejected record doesn't stop the others.
+            3. Cache Invalidation: Invalidates the user_cache entries of the inserted records.
+            4. Activity Log: Increments the account_creations count by the number of inserted records.
+
+        Returns:
+            list: The write errors of the rejected records (e.g. code 11000 for a registered username), with the "index" of the record in records. Empty if every record was inserted.
+
+        Error Handling:
+            Other exceptions during document access are raised to the caller.
+        """
+        if not records:
+            return []
+        usernames.addMany([record.username for record in records])
+        write_errors = []
+        try:
+            users.insert_many([record.to_document() for record in records], ordered=False)
+        except errors.BulkWriteError as b:
+            write_errors = b.details['writeErrors']
+        failed = {error['index'] for error in write_errors}
+        for index, record in enumerate(records):
+            if index not in failed:
+                user_cache.invalidate(record.id, record.username)
+        if len(records) > len(failed):
+            activity_counter.increment({"account_creations": len(records) - len(failed)})
+        return write_errors
+
+
+    def fetch(record_id:str):
+        """
+        Summary of the fetch Function:
+            The fetch function returns a whole user record, served from the user_cache or read with a single find_one on a cache miss. It doesn't print anything nor touch the activity log, get() is built on top of it.
+
+        Returns:
+            UserRecord: The record, or None if no record matches the ID.
+
+        Raises:
+            PyMongoError: Raised if the database can't be reached.
+        """
+        record = user_cache.get(record_id)
+        if record is None:
+            document = users_collection.find_one({"_id": record_id})
+            if document is None:
+                return None
+            record = UserRecord.from_document(document)
+            user_cache.put(record)
+        return record
+
+
+    def fetchByUsername(username:str):
+        """
+        Summary of the fetchByUsername Function:
+            The fetchByUsername function is the same as fetch(), by username. The username is normalized the same way User stores it, so the lookup is case-insensitive. A username the username_filter (see bloom.py) has never seen returns None without a query.
+
+        Returns:
+            UserRecord: The record, or None if no record matches the username.
+        """
+        username = normalize_username(username)
+        if not username_filter.mightExist(username):
+            return None
+        record = user_cache.getByUsername(username)
+        if record is None:
+            document = users_collection.find_one({"username": username})
+            if document is None:
+                return None
+            record = UserRecord.from_document(document)
+            user_cache.put(record)
+        return record
 
 
     def setUsername(record_id:str, new_username:str):
@@ -76,34 +189,38 @@ class User:
             new_username (str): The new username to be assigned to the user.
             
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Username Validation: Checks if the new username already exists in the users_collection. If it does, it returns None.
-            5. Update Username: If the new username is unique, it increments the username modification count in the activity_collection and updates the username in the users_collection.
-            6. Return Updated Username: Returns the new username if the update is successful.
+            1. Username Validation: Checks the new username against its rule and normalizes it to its canonical form (see validation.py). If it is invalid, it returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Username: Sends a single update_one for the provided record_id. Username uniqueness is enforced by the unique "username" index, so a taken username is rejected by the database itself. If it is taken, it returns None.
+            4. Invalid ID Handling: If the update matched no record, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the username modification count through the activity_counter.
+            6. Return Updated Username: Returns the new (canonical) username if the update is successful.
         
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            new_username = validate("username", new_username)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            username_filter.add(new_username)
+            result = users_collection.update_one({"_id": record_id}, {"$set": {"username": new_username}})
+        except errors.DuplicateKeyError:
+            print()
+            return None
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if result.matched_count == 0:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                username_validation = users_collection.count_documents({"username": new_username})
-                if username_validation == 1:
-                    print()
-                    return None
-                else:
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.username": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"username": new_username}})
-                    return new_username
+                activity_counter.increment({"account_modifications.username": 1})
+                user_cache.invalidate(record_id)
+                return new_username
 
     def setPassword(record_id:str, new_password:str):
         """
@@ -115,34 +232,36 @@ class User:
             new_password (str): The new password to be assigned to the user.
             
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Password Validation: Checks if the new password length is greater than 8 characters. If not, it returns None.
-            5. Update Password: If the new password meets the length requirement, it increments the password modification count in the activity_collection and updates the password in the users_collection.
-            6. Return Updated Password: Returns the new password if the update is successful.
+            1. Password Validation: Checks the new password against its rule (see validation.py). If not, it returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Password: Hashes the new password with the current hasher (see hashing.py) and sends a single update_one for the provided record_id.
+            4. Invalid ID Handling: If the update matched no record, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the password modification count through the activity_counter.
+            6. Revoke Sessions: Revokes every session token issued to the record so far (see sessions.py).
+            7. Return Updated Password: Returns the new password if the update is successful.
         
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            new_password = validate("password", new_password)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            result = users_collection.update_one({"_id": record_id}, {"$set": {"password": hashPassword(new_password)}})
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if result.matched_count == 0:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                password_validation = len(new_password)
-                if password_validation <= 8:
-                    print()
-                    return None
-                else:
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.password": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"password": new_password}})
-                    return new_password
+                activity_counter.increment({"account_modifications.password": 1})
+                user_cache.invalidate(record_id)
+                _revokeSessions(record_id, {"password": new_password})
+                return new_password
 
     def setFirstName(record_id:str, first_name:str):
         """
@@ -154,34 +273,34 @@ class User:
             first_name (str): The new first name to be assigned to the user.
             
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Name Validation: Checks if the new first name length is greater than 2 characters. If not, it returns None.
-            5. Update First Name: If the new first name meets the length requirement, it increments the first name modification count in the activity_collection and updates the first name in the users_collection.
+            1. Name Validation: Checks the new first name against its rule and capitalizes it (see validation.py). If not, it returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update First Name: Sends a single update_one for the provided record_id.
+            4. Invalid ID Handling: If the update matched no record, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the first name modification count through the activity_counter.
             6. Return Updated First Name: Returns the new first name if the update is successful.
         
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            first_name = validate("first_name", first_name)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            result = users_collection.update_one({"_id": record_id}, {"$set": {"first_name": first_name}})
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if result.matched_count == 0:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                name_validation = len(first_name)
-                if name_validation <= 2:
-                    print()
-                    return None
-                else:
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.first_name": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"first_name": first_name}})
-                    return first_name
+                activity_counter.increment({"account_modifications.first_name": 1})
+                user_cache.invalidate(record_id)
+                return first_name
 
     def setLastName(record_id:str, last_name:str):
         """
@@ -193,34 +312,34 @@ class User:
             last_name (str): The new last name to be assigned to the user.
         
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Name Validation: Checks if the new last name length is greater than 2 characters. If not, it returns None.
-            5. Update Last Name: If the new last name meets the length requirement, it increments the last name modification count in the activity_collection and updates the last name in the users_collection.
+            1. Name Validation: Checks the new last name against its rule and capitalizes it (see validation.py). If not, it returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Last Name: Sends a single update_one for the provided record_id.
+            4. Invalid ID Handling: If the update matched no record, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the last name modification count through the activity_counter.
             6. Return Updated Last Name: Returns the new last name if the update is successful.
         
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            last_name = validate("last_name", last_name)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            result = users_collection.update_one({"_id": record_id}, {"$set": {"last_name": last_name}})
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if result.matched_count == 0:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                name_validation = len(last_name)
-                if name_validation <= 2:
-                    print()
-                    return None
-                else:
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.last_name": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"last_name": last_name}})
-                    return last_name
+                activity_counter.increment({"account_modifications.last_name": 1})
+                user_cache.invalidate(record_id)
+                return last_name
 
     def setDOB(record_id:str, date:str):
         """
@@ -232,31 +351,33 @@ class User:
             date (str): The new date of birth to be assigned to the user, in the format YYYY-MM-DD.
             
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Process Date: Splits the provided date string and converts it to a datetime object.
-            5. Update DOB: Updates the DOB in the users_collection and increments the DOB modification count in the activity_collection.
+            1. Date Validation: Checks the provided date against its rule and converts it to a datetime object (see validation.py). If it is invalid, it returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update DOB: Sends a single update_one for the provided record_id.
+            4. Invalid ID Handling: If the update matched no record, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the DOB modification count through the activity_counter.
             6. Return Updated DOB: Returns the new DOB if the update is successful.
             
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            final_date = validate("dob", date)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            result = users_collection.update_one({"_id": record_id}, {"$set": {"dob": final_date}})
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if result.matched_count == 0:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                filteredDate = date.split("-")
-                processed_date = filteredDate[0]+ "-" + filteredDate[1] + "-" + filteredDate[2]
-                final_date = datetime.strptime(f"{processed_date}", "%Y-%m-%d")
-                users_collection.find_one_and_update({"_id": record_id}, {"$set": {"dob": final_date}})
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.dob": 1}})
+                activity_counter.increment({"account_modifications.dob": 1})
+                user_cache.invalidate(record_id)
                 return final_date
             
     def setGender(record_id:str, new_gender:str):
@@ -269,41 +390,34 @@ class User:
             new_gender (str): The new gender to be assigned to the user. Valid options are "male" and "female".
             
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Gender Validation: Checks if the new gender is valid and different from the current gender. If not, it returns None.
-            5. Update Gender: If the new gender is valid and different, it increments the gender modification count in the activity_collection and updates the gender in the users_collection.
+            1. Gender Validation: Checks the new gender against its rule (see validation.py). If not, it returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Gender: Sends a single conditional update_one that only matches the record if its current gender is different from the new one.
+            4. No Match Handling: If nothing matched, _reportUnmatched tells apart an invalid ID (prints an invalid ID message) from an unchanged gender, and None is returned.
+            5. Activity Log: Increments the gender modification count through the activity_counter.
             6. Return Updated Gender: Returns the new gender if the update is successful.
             
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            new_gender = validate("gender", new_gender)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            result = users_collection.update_one({"_id": record_id, "gender": {"$ne": new_gender}}, {"$set": {"gender": new_gender}})
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
+            if result.matched_count == 0:
+                _reportUnmatched(record_id)
                 return None
             else:
-                genders = ["male", "female"]
-                current_gender=str
-                check = users_collection.find({"_id": record_id})
-                for i in check:
-                    current_gender = i['gender']                
-                if new_gender.lower() not in genders:
-                    print()
-                    return None
-                elif current_gender == new_gender.capitalize():
-                    print()
-                    return None                    
-                else:
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.gender": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"gender": new_gender.capitalize()}})
-                    return new_gender.capitalize()
+                activity_counter.increment({"account_modifications.gender": 1})
+                user_cache.invalidate(record_id)
+                return new_gender
                 
     def setRole(record_id:str, new_role:str):
         """
@@ -315,34 +429,34 @@ class User:
             new_role (str): The new role to be assigned to the user. Valid roles are "user", "admin", and "developer".
             
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Role Validation: Checks if the new role is valid. If not, it prints an invalid role message and returns None.
-            5. Update Role: If the new role is valid, it increments the role modification count in the activity_collection and updates the role in the users_collection.
+            1. Role Validation: Checks the new role against its rule (see validation.py). If not, it prints an invalid role message and returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Role: Sends a single update_one for the provided record_id.
+            4. Invalid ID Handling: If the update matched no record, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the role modification count through the activity_counter.
             6. Return Updated Role: Returns the new role if the update is successful.
             
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            new_role = validate("role", new_role)
+        except FieldValidationError as v:
+            print(f"Invalid Role: {v}")
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            result = users_collection.update_one({"_id": record_id}, {"$set": {"role": new_role}})
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if result.matched_count == 0:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                roles = ["user", "admin", "developer"]
-                if new_role.lower() not in roles:
-                    print(f"Invalid Role: your role selections must be one of the following: {roles}")
-                    return None
-                else:
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.role": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"role": new_role.lower()}})
-                    return new_role.lower()
+                activity_counter.increment({"account_modifications.role": 1})
+                user_cache.invalidate(record_id)
+                return new_role
 
     def setState(record_id:str, new_state:bool):
         """
@@ -355,36 +469,34 @@ class User:
             
         Function Steps:
             1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. State Validation: Checks if the new state is different from the current state. If not, it returns None.
-            5. Update State: If the new state is valid, it increments the state modification count in the activity_collection and updates the state in the users_collection.
+            2. Update State: Sends a single conditional update_one that only matches the record if its current state is different from the new one.
+            3. No Match Handling: If nothing matched, _reportUnmatched tells apart an invalid ID (prints an invalid ID message) from an unchanged state, and None is returned.
+            4. Activity Log: Increments the state modification count through the activity_counter.
+            5. Revoke Sessions: If the account was deactivated, revokes every session token issued to the record so far (see sessions.py).
             6. Return Updated State: Returns the new state if the update is successful.
             
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            new_state = validate("account_state", new_state)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            result = users_collection.update_one({"_id": record_id, "account_state": {"$ne": new_state}}, {"$set": {"account_state": new_state}})
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
+            if result.matched_count == 0:
+                _reportUnmatched(record_id)
                 return None
             else:
-                current_state=bool
-                check = users_collection.find({"_id": record_id})
-                for i in check:
-                    current_state = i['account_state']
-                if current_state == new_state:
-                    print()
-                    return None
-                else:
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.state": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"account_state": new_state}})
-                    return new_state
+                activity_counter.increment({"account_modifications.state": 1})
+                user_cache.invalidate(record_id)
+                _revokeSessions(record_id, {"account_state": new_state})
+                return new_state
 
     def setComment(record_id, new_comment:str):
         """
@@ -396,140 +508,306 @@ class User:
             new_comment (str): The new comment to be appended to the existing comments.
             
         Function Steps:
-            1. Request Processing: Prints a message indicating that the request is being processed.
-            2. Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            4. Comment Validation: Checks if the new comment length is greater than 4 characters. If not, it returns None.
-            5. Update Comment: If the new comment is valid, it concatenates it with existing comments, increments the comment modification count in the activity_collection, and updates the comment field in the users_collection.
+            1. Comment Validation: Checks the new comment against its rule (see validation.py). If not, it returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Comment: Sends a single find_one_and_update whose pipeline concatenates the new comment with the existing comments on the server, and returns the updated comment field.
+            4. Invalid ID Handling: If no document was returned, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the comment modification count through the activity_counter.
             6. Return Updated Comment: Returns the updated comment string if the update is successful.
             
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        try:
+            new_comment = validate("comment", new_comment)
+        except FieldValidationError:
+            print()
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            comment_string = {"$concat": [{"$ifNull": ["$comment", ""]}, "\n | ", {"$literal": new_comment}]}
+            user = users_collection.find_one_and_update({"_id": record_id}, [{"$set": {"comment": comment_string}}], projection={"comment": 1}, return_document=ReturnDocument.AFTER)
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if user is None:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                comment_validation = len(new_comment)
-                if comment_validation <= 4:
-                    print()
-                    return None
-                else:
-                    old_comments=str
-                    for i in users_collection.find({"_id": record_id}):
-                        old_comments = i['comment']
-                    comment_string = old_comments + "\n | " + new_comment
-                    activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_modifications.comment": 1}})
-                    users_collection.find_one_and_update({"_id": record_id}, {"$set": {"comment": comment_string}})
-                    return comment_string
+                activity_counter.increment({"account_modifications.comment": 1})
+                user_cache.invalidate(record_id)
+                return user['comment']
 
 
 
-    def getUsername(record_id):
+    def update(record_id:str, **fields):
         """
-        Summary of the getUsername Function:
-            The getUsername function retrieves the username of a user record from a MongoDB collection.
+        Summary of the update Function:
+            The update function applies several field changes to a user record in a single write, instead of calling the set* functions one after another.
 
         Parameters:
-            record_id (str): The unique identifier of the user record to be retrieved.
-            
+            record_id (str): The unique identifier of the user record to be updated.
+            **fields: The fields to be updated, using the record field names (username, password, first_name, last_name, dob, gender, role, account_state, comment). The comment is appended to the existing comments, the same way setComment does it.
+
         Function Steps:
-            Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the username view count in the activity_collection.
-            Retrieve Username: Finds the user record and returns the username.
-            
+            1. Fields Validation: Validates and formats every field locally through _prepareUpdate. If any field is invalid, it prints an incorrect value message and returns None without contacting the database.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Record: Sends a single find_one_and_update with all the changes, returning the updated fields.
+            4. Invalid ID Handling: If no document was returned, it prints an invalid ID message and returns None.
+            5. Activity Log: Increments the modification count of every updated field in one combined increment of the activity_counter.
+            6. Return Updated Fields: Returns a dictionary of the updated fields and their new values.
+
         Error Handling:
-            Handles exceptions during document access and prints an appropriate error message.
+            Handles a taken username (unique "username" index) and exceptions during document access, and prints an appropriate error message.
+
+        Example:
+            >>> User.update(record_id, first_name="Ahmed", gender="male", role="admin")
+            {'first_name': 'Ahmed', 'gender': 'Male', 'role': 'admin'}
         """
+        try:
+            update, counters = _prepareUpdate(fields)
+        except ValueError as v:
+            print(f"🔤 | Incorrect Value: {v}\n")
+            return None
         try:
             print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            if "username" in fields:
+                username_filter.add(normalize_username(fields['username']))
+            user = users_collection.find_one_and_update({"_id": record_id}, update, projection={field: 1 for field in fields}, return_document=ReturnDocument.AFTER)
+        except errors.DuplicateKeyError:
+            print("⚠️ | Existing Username: this username is already registered..\n")
+            return None
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if user is None:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.username": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['username']
+                activity_counter.increment(counters)
+                user_cache.invalidate(record_id)
+                _revokeSessions(record_id, fields)
+                user.pop("_id", None)
+                return user
 
+    def updateMany(updates:dict):
+        """
+        Summary of the updateMany Function:
+            The updateMany function is the bulk variant of update, it applies field changes to many user records using one bulk_write.
 
-    def getPassword(record_id):
+        Parameters:
+            updates (dict): A dictionary mapping each record_id to a dictionary of fields to be updated, e.g. {record_id: {"first_name": "Ahmed", "role": "admin"}}.
+
+        Function Steps:
+            1. Fields Validation: Validates and formats the fields of every record locally. If any record is invalid, it prints an incorrect value message and returns None, so nothing is written.
+            2. Request Processing: Prints a message indicating that the request is being processed.
+            3. Update Records: Sends one unordered bulk_write made of an UpdateOne per record.
+            4. Unmatched Records: If fewer records matched than were written, one projected find on the written IDs tells which ones don't exist, they aren't counted and their sessions aren't revoked. If none matched, nothing is counted.
+            5. Activity Log: Sums the modification counts of every matched record and applies them in one combined increment of the activity_counter.
+            6. Return Result: Returns a dictionary with the "matched" and "modified" counts, and the record IDs that failed to be written under "failed".
+
+        Error Handling:
+            Handles write errors (e.g. a taken username) by reporting the failed record IDs, and prints an appropriate error message for other exceptions.
+
+        Notes:
+            bulk_write only reports totals, so telling the unmatched IDs apart costs one extra query, only when some of them didn't match. A record deleted between the write and that query isn't counted, and if that query fails every written record is counted.
         """
-        Summary of the getPassword Function:
-            The getPassword function retrieves the password of a user record from a MongoDB collection.
+        operations = []
+        operation_counters = []  # counters of each record, indexed like operations
+        counters = {}
+        renamed = []
+        try:
+            for record_id, fields in updates.items():
+                update, record_counters = _prepareUpdate(fields)
+                operations.append(UpdateOne({"_id": record_id}, update))
+                operation_counters.append(record_counters)
+                if "username" in fields:
+                    renamed.append(normalize_username(fields['username']))
+                for counter in record_counters:
+                    counters[counter] = counters.get(counter, 0) + 1
+        except ValueError as v:
+            print(f"🔤 | Incorrect Value: record {record_id}, {v}\n")
+            return None
+        if len(operations) == 0:
+            return {"matched": 0, "modified": 0, "failed": []}
+        record_ids = list(updates)
+        failed = []
+        try:
+            print("🔃 | Processing request..\n")
+            username_filter.addMany(renamed)
+            result = users_collection.bulk_write(operations, ordered=False)
+            matched, modified = result.matched_count, result.modified_count
+        except errors.BulkWriteError as b:
+            matched, modified = b.details['nMatched'], b.details['nModified']
+            for error in b.details['writeErrors']:
+                failed.append(record_ids[error['index']])
+                for counter in operation_counters[error['index']]:
+                    counters[counter] -= 1
+            print(f"⚠️ | Partial Update: {len(failed)} record(s) couldn't be updated\n")
+        except Exception as e:
+            print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
+            return None
+        written = [index for index, record_id in enumerate(record_ids) if record_id not in failed]
+        missing = set()
+        if matched == 0:
+            missing = set(written)
+        elif matched < len(written):
+            try:
+                found = {record['_id'] for record in users_collection.find({"_id": {"$in": [record_ids[index] for index in written]}}, {"_id": 1})}
+                missing = {index for index in written if record_ids[index] not in found}
+            except Exception as e:
+                print(f"📤 | Request Error: unable to find the unmatched records, they are counted\n🚧 | {e}\n")
+        for index in missing:
+            for counter in operation_counters[index]:
+                counters[counter] -= 1
+        for index, record_id in enumerate(record_ids):
+            user_cache.invalidate(record_id)
+            if index in written and index not in missing:
+                _revokeSessions(record_id, updates[record_id])
+        counters = {counter: count for counter, count in counters.items() if count > 0}
+        if counters:
+            activity_counter.increment(counters)
+        return {"matched": matched, "modified": modified, "failed": failed}
+
+
+    def get(record_id:str, fields:list=None):
+        """
+        Summary of the get Function:
+            The get function retrieves several fields of a user record from a MongoDB collection in one query, instead of one query per field.
 
         Parameters:
             record_id (str): The unique identifier of the user record to be retrieved.
-            
+            fields (list): The record fields to be retrieved (username, password, first_name, last_name, dob, gender, role, account_state, comment). All of them are retrieved if it isn't provided.
+
         Function Steps:
-            Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the password view count in the activity_collection.
-            Retrieve Password: Finds the user record and returns the password.
-        
+            1. Fields Validation: Checks that every requested field is a known record field. If not, it prints an incorrect value message and returns None.
+            2. Retrieve Record: Calls fetch(), which serves the record from the user_cache, or runs a single find_one on a cache miss and caches the fetched record.
+            3. Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
+            4. Update Activity Log: Increments the view count of every requested field in one combined increment of the activity_counter.
+            5. Return Fields: Returns a dictionary of the requested fields and their values.
+
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
+
+        Example:
+            >>> User.get(record_id, ["first_name", "last_name"])
+            {'first_name': 'Ahmed', 'last_name': 'Saleh'}
         """
+        if fields is None:
+            fields = _FIELDS
+        unknown = [field for field in fields if field not in _FIELDS]
+        if unknown or len(fields) == 0:
+            print(f"🔤 | Incorrect Value: fields must be some of the following: {_FIELDS}\n")
+            return None
         try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            user = User.fetch(record_id)
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
+            if user is None:
                 print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
                 return None
             else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.password": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['password']
+                activity_counter.increment({"account_views." + _COUNTER_NAMES.get(field, field): 1 for field in fields})
+                return {field: user.get(field) for field in fields}
 
-    def getFirstName(record_id):
+    def getByUsername(username:str, fields:list=None):
         """
-        Summary of the getFirstName Function:
-            The getFirstName function retrieves the first name of a user record from a MongoDB collection.
+        Summary of the getByUsername Function:
+            The getByUsername function retrieves several fields of a user record by its username, using the same cache as get().
 
         Parameters:
-            record_id (str): The unique identifier of the user record to be retrieved.
-            
+            username (str): The username of the user record to be retrieved, it is normalized the same way User stores it.
+            fields (list): The record fields to be retrieved. All of them, plus the "_id", are retrieved if it isn't provided.
+
         Function Steps:
-            Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the first name view count in the activity_collection.
-            Retrieve First Name: Finds the user record and returns the first name.
-            
+            1. Fields Validation: Checks that every requested field is a known record field. If not, it prints an incorrect value message and returns None.
+            2. Retrieve Record: Calls fetchByUsername(), which serves the record from the user_cache, or runs a single find_one on the "username" index on a cache miss and caches the fetched record.
+            3. Unknown Username Handling: If no matching record is found, it prints an invalid username message and returns None.
+            4. Return Fields: Returns a dictionary of the requested fields and their values.
+
         Error Handling:
             Handles exceptions during document access and prints an appropriate error message.
         """
+        if fields is None:
+            fields = ["_id"] + _FIELDS
+        unknown = [field for field in fields if field != "_id" and field not in _FIELDS]
+        if unknown or len(fields) == 0:
+            print(f"🔤 | Incorrect Value: fields must be some of the following: {_FIELDS}\n")
+            return None
         try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            user = User.fetchByUsername(username)
         except Exception as e:
             print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
         else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
+            if user is None:
+                print(f"🔎 | Invalid Username: couldn't find any record related to provided username\n")
                 return None
             else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.first_name": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['first_name']
+                return {field: user.get(field) for field in fields}
+
+    def getUsername(record_id):
+        """
+        Summary of the getUsername Function:
+            The getUsername function retrieves the username of a user record from a MongoDB collection.
+
+        Parameters:
+            record_id (str): The unique identifier of the user record to be retrieved.
+            
+        Function Steps:
+            Request Processing: Prints a message indicating that the request is being processed.
+            Retrieve Username: Calls get() for the "username" field only, which runs one projected query and increments the username view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
+            
+        Error Handling:
+            Handled by get(), which prints an appropriate error message.
+        """
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["username"])
+        if user is not None:
+            return user['username']
+
+    def getPassword(record_id):
+        """
+        Summary of the getPassword Function:
+            The getPassword function retrieves the password of a user record from a MongoDB collection.
+
+        Parameters:
+            record_id (str): The unique identifier of the user record to be retrieved.
+            
+        Function Steps:
+            Request Processing: Prints a message indicating that the request is being processed.
+            Retrieve Password: Calls get() for the "password" field only, which runs one projected query and increments the password view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
+            
+        Error Handling:
+            Handled by get(), which prints an appropriate error message.
+        """
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["password"])
+        if user is not None:
+            return user['password']
+
+    def getFirstName(record_id):
+        """
+        Summary of the getFirstName Function:
+            The getFirstName function retrieves the first name of a user record from a MongoDB collection.
+
+        Parameters:
+            record_id (str): The unique identifier of the user record to be retrieved.
+            
+        Function Steps:
+            Request Processing: Prints a message indicating that the request is being processed.
+            Retrieve First Name: Calls get() for the "first_name" field only, which runs one projected query and increments the first name view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
+            
+        Error Handling:
+            Handled by get(), which prints an appropriate error message.
+        """
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["first_name"])
+        if user is not None:
+            return user['first_name']
 
     def getLastName(record_id):
         """
@@ -541,28 +819,16 @@ class User:
             
         Function Steps:
             Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the last name view count in the activity_collection.
-            Retrieve Last Name: Finds the user record and returns the last name.
+            Retrieve Last Name: Calls get() for the "last_name" field only, which runs one projected query and increments the last name view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
             
         Error Handling:
-            Handles exceptions during document access and prints an appropriate error message.
+            Handled by get(), which prints an appropriate error message.
         """
-        try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
-        except Exception as e:
-            print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
-        else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
-                return None
-            else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.last_name": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['last_name']
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["last_name"])
+        if user is not None:
+            return user['last_name']
 
     def getDOB(record_id):
         """
@@ -574,28 +840,16 @@ class User:
             
         Function Steps:
             Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the date of birth view count in the activity_collection.
-            Retrieve DOB: Finds the user record and returns the date of birth.
+            Retrieve DOB: Calls get() for the "dob" field only, which runs one projected query and increments the date of birth view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
             
         Error Handling:
-            Handles exceptions during document access and prints an appropriate error message.
+            Handled by get(), which prints an appropriate error message.
         """
-        try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
-        except Exception as e:
-            print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
-        else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
-                return None
-            else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.dob": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['dob']
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["dob"])
+        if user is not None:
+            return user['dob']
 
     def getGender(record_id):
         """
@@ -607,28 +861,16 @@ class User:
             
         Function Steps:
             Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the gender view count in the activity_collection.
-            Retrieve Gender: Finds the user record and returns the gender.
+            Retrieve Gender: Calls get() for the "gender" field only, which runs one projected query and increments the gender view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
             
         Error Handling:
-            Handles exceptions during document access and prints an appropriate error message.
+            Handled by get(), which prints an appropriate error message.
         """
-        try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
-        except Exception as e:
-            print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
-        else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
-                return None
-            else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.gender": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['gender']
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["gender"])
+        if user is not None:
+            return user['gender']
 
     def getRole(record_id):
         """
@@ -640,28 +882,16 @@ class User:
             
         Function Steps:
             Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the role view count in the activity_collection.
-            Retrieve Role: Finds the user record and returns the role.
+            Retrieve Role: Calls get() for the "role" field only, which runs one projected query and increments the role view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
             
         Error Handling:
-            Handles exceptions during document access and prints an appropriate error message.
+            Handled by get(), which prints an appropriate error message.
         """
-        try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
-        except Exception as e:
-            print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
-        else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
-                return None
-            else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.role": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['role']
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["role"])
+        if user is not None:
+            return user['role']
 
     def getState(record_id):
         """
@@ -673,28 +903,16 @@ class User:
             
         Function Steps:
             Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the account state view count in the activity_collection.
-            Retrieve State: Finds the user record and returns the account state.
+            Retrieve Account State: Calls get() for the "account_state" field only, which runs one projected query and increments the account state view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
             
         Error Handling:
-            Handles exceptions during document access and prints an appropriate error message.
+            Handled by get(), which prints an appropriate error message.
         """
-        try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
-        except Exception as e:
-            print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
-        else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
-                return None
-            else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.state": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['account_state']
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["account_state"])
+        if user is not None:
+            return user['account_state']
 
     def getComment(record_id):
         """
@@ -706,25 +924,103 @@ class User:
             
         Function Steps:
             Request Processing: Prints a message indicating that the request is being processed.
-            Check Record Existence: Verifies if a document with the provided record_id exists in the users_collection. If an error occurs, it prints an error message.
-            Invalid ID Handling: If no matching record is found, it prints an invalid ID message and returns None.
-            Update Activity Log: Increments the comment view count in the activity_collection.
-            Retrieve Comment: Finds the user record and returns the comment.
+            Retrieve Comment: Calls get() for the "comment" field only, which runs one projected query and increments the comment view count through the activity_counter.
+            Invalid ID Handling: If no matching record is found, get() prints an invalid ID message and None is returned.
             
         Error Handling:
-            Handles exceptions during document access and prints an appropriate error message.
+            Handled by get(), which prints an appropriate error message.
         """
+        print("🔃 | Processing request..\n")
+        user = User.get(record_id, ["comment"])
+        if user is not None:
+            return user['comment']
+
+
+def _reportUnmatched(record_id:str) -> None:
+    """
+    Summary of the _reportUnmatched Function:
+        The _reportUnmatched function explains why a conditional update matched no record. It is only called on the failure path, so successful updates never pay for an existence check.
+
+    Parameters:
+        record_id (str): The unique identifier of the user record that the update targeted.
+
+    Function Steps:
+        1. Check Record Existence: Runs a count_documents limited to one document for the provided record_id.
+        2. Report: Prints an invalid ID message if the record doesn't exist, otherwise prints an empty line (the value was unchanged).
+    """
+    if users_collection.count_documents({"_id": record_id}, limit=1) == 0:
+        print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
+    else:
+        print()
+
+
+def _revokeSessions(record_id:str, fields:dict) -> None:
+    # A new password or a deactivated account ends every session issued so far, see sessions.py
+    if "password" in fields or fields.get("account_state") is False:
         try:
-            print("🔃 | Processing request..\n")
-            check = users_collection.count_documents({"_id": record_id})
+            session_manager.revokeUser(record_id)
         except Exception as e:
-            print(f"📤 | Request Error: unable to access collection/document\n🚧 | {e}\n")
-        else:
-            if check == 0:
-                print(f"🔎 | Invalid ID: couldn't find any record related to provided ID\n")
-                return None
-            else:
-                activity_collection.find_one_and_update({"_id": "C1"}, {"$inc": {"account_views.comment": 1}})
-                user = users_collection.find({"_id": record_id})           
-                for i in user:
-                    return i['comment']        
+            print(f"📤 | Session Error: the sessions were only revoked on this node\n🚧 | {e}\n")
+
+
+def _prepareUpdate(fields:dict) -> tuple:
+    """
+    Summary of the _prepareUpdate Function:
+        The _prepareUpdate function validates and formats a set of field changes using the same rules as the set* functions, and builds the matching MongoDB update.
+
+    Parameters:
+        fields (dict): The fields to be updated and their new values.
+
+    Function Steps:
+        1. Field Validation: Checks each field against its rule and normalizes its value through validate_record (see validation.py), then hashes the password.
+        2. Build Update: Builds a $set update, or an update pipeline when a comment has to be appended to the existing comments on the server.
+        3. Build Counters: Builds the activity_collection "account_modifications" counters of the updated fields.
+
+    Returns:
+        tuple: The update document (or pipeline) and the $inc counters dictionary.
+
+    Raises:
+        FieldValidationError: Raised if a field is unknown, if no field is provided, or if a value doesn't meet its field's rule.
+    """
+    values = validate_record(fields)
+    if "password" in values:
+        values['password'] = hashPassword(values['password'])
+    comment = values.pop("comment", None)
+    counters = {"account_modifications." + _COUNTER_NAMES.get(field, field): 1 for field in fields}
+    if comment is None:
+        return {"$set": values}, counters
+    stage = {field: {"$literal": value} for field, value in values.items()}
+    stage["comment"] = {"$concat": [{"$ifNull": ["$comment", ""]}, "\n | ", {"$literal": comment}]}
+    return [{"$set": stage}], counters
+
+
+def _prepareAccount(username:str, password:str, first_name:str, last_name:str, dob:str, gender:str, role:str="user") -> UserRecord:
+    """
+    Summary of the _prepareAccount Function:
+        The _prepareAccount function validates the details of a new account with the same rules as create_new_account, and builds the user record to be inserted.
+
+    Parameters:
+        username, password, first_name, last_name, dob, gender, role: The details of the new account, dob in the format YYYY-MM-DD.
+
+    Returns:
+        UserRecord: The user record, with a newly generated ID and the hashed password.
+
+    Raises:
+        FieldValidationError: Raised if any of the details doesn't meet its rule.
+    """
+    values = validate_record({"username": username, "password": password, "first_name": first_name, "last_name": last_name, "dob": dob, "gender": gender, "role": role}, ACCOUNT_FIELDS)
+    return _accountRecord(values, hashPassword(values['password']))
+
+
+def _accountRecord(values:dict, password_hash:str, record_id:str=None) -> UserRecord:
+    """
+    Summary of the _accountRecord Function:
+        The _accountRecord function builds the user record of a new account from its validated details (see validation.validate_record) and its password hash.
+
+    Parameters:
+        record_id (str): The ID of the record, a new one is generated if it isn't provided. The bulk paths generate theirs at once with ids.generateIDs().
+
+    Returns:
+        UserRecord: The user record.
+    """
+    return UserRecord(record_id or generateID(), values['username'], password_hash, values['first_name'], values['last_name'], values['dob'], values['gender'], values.get('role', "user"), True, "")
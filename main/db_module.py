@@ -1,5 +1,6 @@
 from dotenv import dotenv_values
-from pymongo import MongoClient, errors
+from pymongo import MongoClient, errors, monitoring
+from threading import Lock
 
 config = dotenv_values("authenticator/main/side/.env")  # Loading our .env variables as config in a dictionary formate
         
@@ -24,6 +25,8 @@ def databaseConnection() -> MongoClient:
     Notes:
     - This function hides the database connection details from the main code, enhancing security and control.
     - Import this function in your main or index.py file to establish a database connection.
+    - The connection pool is tuned from the .env file, see poolOptions().
+    - You usually don't need to call it yourself, getClient() calls it once, on the first database access.
 
     FAQ:
     Q: Why are we using this method?
@@ -40,7 +43,7 @@ def databaseConnection() -> MongoClient:
         
         if config['database_connection_string']:
             print("🟠 | Connection key retrieved..\n")
-            database = MongoClient(config['database_connection_string'])
+            database = MongoClient(config['database_connection_string'], event_listeners=[pool_stats], **poolOptions())
         else:
             raise Exception
         
@@ -67,23 +70,203 @@ def databaseConnection() -> MongoClient:
         print("🟢 | Connected to database\n")
         return database
     
-# You may implement the following steps in the index.py file, but in my case I will just include them in "db_module.py" 
+# Connection Pool
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Summary of the PoolStats Class:
+        The PoolStats class listens to the MongoClient connection pool events and counts them, so the pool usage can be monitored.
+
+    Methods:
+        snapshot: Returns the pool counters, "open" (connections currently open), "in_use" (connections currently checked out), "created", "closed", "checked_out", "checked_in" and "checkout_failed".
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counters = {"created": 0, "closed": 0, "checked_out": 0, "checked_in": 0, "checkout_failed": 0}
+
+    def _count(self, counter:str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["open"] = counters["created"] - counters["closed"]
+        counters["in_use"] = counters["checked_out"] - counters["checked_in"]
+        return counters
+
+    def connection_created(self, event) -> None:
+        self._count("created")
+
+    def connection_closed(self, event) -> None:
+        self._count("closed")
+
+    def connection_checked_out(self, event) -> None:
+        self._count("checked_out")
+
+    def connection_checked_in(self, event) -> None:
+        self._count("checked_in")
+
+    def connection_check_out_failed(self, event) -> None:
+        self._count("checkout_failed")
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+
+pool_stats = PoolStats()
+
+
+def poolOptions() -> dict:
+    """
+    Build the MongoClient connection pool options from the .env file.
+
+    Supported .env keys (all optional, pymongo's defaults are used for the missing ones):
+        max_pool_size: Maximum number of connections in the pool (maxPoolSize).
+        min_pool_size: Number of connections kept open even when idle (minPoolSize).
+        wait_queue_timeout_ms: How long a request waits for a free connection before failing (waitQueueTimeoutMS).
+        server_selection_timeout_ms: How long a request waits for an available server before failing (serverSelectionTimeoutMS).
+
+    Returns:
+        dict: The keyword arguments to pass to MongoClient.
+    """
+    options = {}
+    for key, option in (("max_pool_size", "maxPoolSize"), ("min_pool_size", "minPoolSize"), ("wait_queue_timeout_ms", "waitQueueTimeoutMS"), ("server_selection_timeout_ms", "serverSelectionTimeoutMS")):
+        if config.get(key):
+            options[option] = int(config[key])
+    return options
+
+
+_client = None
+_client_lock = Lock()
+_database_name = 'authenticator'
+
+
+def getClient() -> MongoClient:
+    """
+    Return the shared MongoClient, creating it on first use.
+
+    Steps:
+    1. If the client already exists, return it (no locking on this path).
+    2. Otherwise, take the lock, call databaseConnection() once, and run the startup bootstrap (see _bootstrap()).
+
+    Returns:
+        MongoClient: The shared client, safe to use from any thread.
+
+    Raises:
+        ConnectionFailure: If the connection couldn't be established, the next call will try again.
+
+    Notes:
+    - Importing this module doesn't touch the network, the connection is only made on the first database access.
+    - MongoClient is thread safe and keeps its own connection pool, so one client is shared by the whole process.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client = databaseConnection()
+                if client is None:
+                    raise errors.ConnectionFailure("unable to establish a connection with the database")
+                _client = client
+                _bootstrap()
+    return _client
+
+
+def getDatabase():
+    """Return the "authenticator" database of the shared client (or the one chosen with setClient())."""
+    return getClient()[_database_name] # accessing/specifying our cluster in the database
+
+
+def getDatabaseName() -> str:
+    """Return the name of the application database, "authenticator" unless another one was chosen with setClient(). The async client (see async_auth.py) uses it too."""
+    return _database_name
+
+
+def currentClient():
+    """Return the client currently in use (None if no database access was made yet), without connecting, e.g. to put it back with setClient() after a benchmark."""
+    return _client
+
+
+def setClient(client, database_name:str='authenticator') -> None:
+    """
+    Use an already created client instead of connecting with the .env connection string, e.g. a scratch mongod or an in-process mock for benchmarks (see benchmark.py).
+
+    Every collection of this module then points to the database_name database of that client, and the startup bootstrap runs on it. With client=None, the next database access connects with the .env connection string again.
+    """
+    global _client, _database_name
+    with _client_lock:
+        _client = client
+        _database_name = database_name
+        if client is not None:
+            _bootstrap()
 
-# Clusters
-## One will be used, because of my key restriction to read/write to only one cluster
-cluster = databaseConnection()
 
-try:
-    db = cluster['authenticator'] # accessing/specifying our cluster in the database
-except Exception as e:
-    print(f"📤 | Connection Error: Failed to access database\n🚧 | {e}\n")
+def poolStats() -> dict:
+    """Return the connection pool counters, see PoolStats.snapshot()."""
+    return pool_stats.snapshot()
+
+
+class LazyCollection:
+    """
+    Summary of the LazyCollection Class:
+        The LazyCollection class stands in for a pymongo Collection until it is first used. Every attribute access is forwarded to the real collection of the shared client, which is created at that moment if needed.
+
+    Key Attributes:
+        name: The name of the collection within the "authenticator" database.
+    """
+
+    def __init__(self, name:str) -> None:
+        self.name = name
+
+    def __getattr__(self, attribute:str):
+        return getattr(getDatabase()[self.name], attribute)
+
+    def __repr__(self) -> str:
+        return f"LazyCollection({self.name!r})"
 
 
 # Collections
-try:
 ## Create different collections depending on your project needs, and how you want the authenticator to work
-    users_collection = db['users'] # creating, accessing users collection within the acquired database
-    ## Login activity
-    activity_collection = db['activity'] # creating, accessing a collection within the database dedicated for user login activity(attempts & other events)
-except Exception as e:
-    print(f"📤 | Connection Error: Failed to access collections\n🚧 | {e}\n")
+users_collection = LazyCollection('users') # users collection within the database
+## Login activity
+activity_collection = LazyCollection('activity') # collection within the database dedicated for user login activity(attempts & other events)
+## Login attempts, one event per attempt (see events.py)
+events_collection = LazyCollection('login_events')
+## Session tokens & their revocations, only used when session_store=mongo (see sessions.py)
+sessions_collection = LazyCollection('sessions')
+## Registered & renamed usernames, one document per change, read by the username filters of every node (see bloom.py)
+username_changes_collection = LazyCollection('username_changes')
+
+
+def _bootstrap() -> None:
+    """
+    Run the startup schema steps once, right after the client is created.
+
+    Steps:
+    1. Create the missing indexes declared in schema.py (unique "username", "role" + "account_state", TTL of the login events) and verify the existing ones. It is idempotent, existing indexes aren't rebuilt.
+    2. Print the indexes that couldn't be created or don't match their declaration, the application still starts without them.
+    """
+    from schema import ensure_indexes  # schema.py imports this module
+    try:
+        report = ensure_indexes(getDatabase())
+    except Exception as e:
+        print(f"📤 | Index Error: Failed to verify indexes\n🚧 | {e}\n")
+    else:
+        for index in report:
+            if index['error'] is not None:
+                print(f"📤 | Index Error: {index['collection']}.{index['name']} is {index['status']}\n🚧 | {index['error']}\n")
@@ -0,0 +1,108 @@
+import atexit
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
+from pymongo import errors
+from db_module import config, events_collection
+
+# Outcomes of a login attempt, the same statuses as audit.verify_many
+OUTCOMES = ["verified", "unknown_user", "incorrect_password", "inactive", "rate_limited"]
+
+
+class EventLog:
+    """
+    Summary of the EventLog Class:
+        The EventLog class records one event per login attempt (record ID, username, outcome, source and time) in an in-memory buffer, and writes the buffer behind with batched insert_many calls, so a login never waits for an audit write.
+    The events are stored in the "login_events" collection, its TTL index (see schema.py) removes them after event_ttl_days.
+
+    Key Attributes:
+        collection: The collection holding the events.
+        flush_interval: Number of seconds between two periodic flushes.
+        batch_size: Number of events per insert_many, a flush is triggered as soon as this many events are pending.
+        max_buffer: Maximum number of pending events, the oldest ones are dropped (and counted) if the database stays unreachable.
+        dropped: Number of events dropped because the buffer was full.
+
+    Methods:
+        record: Adds a login attempt to the pending events.
+        flush: Writes all pending events with unordered insert_many batches.
+        close: Stops the periodic flush and flushes the remaining events, it is registered to run at process exit.
+        recent: Returns the latest events of a record or username, newest first.
+
+    Notes:
+        - The background flush thread is started on the first event, so importing the module costs nothing.
+        - If a flush fails, its unwritten events are put back in front of the pending events and retried on the next flush. They keep the "_id" given by the failed insert_many, so an event that was written after all is rejected as a duplicate instead of being stored twice.
+        - Events are only visible in the database after they were flushed, up to flush_interval seconds later.
+    """
+
+    def __init__(self, collection, flush_interval:float=2, batch_size:int=1000, max_buffer:int=10000) -> None:
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.dropped = 0
+        self._pending = []
+        self._lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    def record(self, record_id:str, username:str, outcome:str, source:str=None) -> None:
+        event = {"user_id": record_id, "username": username, "outcome": outcome, "source": source, "created_at": datetime.now(timezone.utc)}
+        with self._lock:
+            self._pending.append(event)
+            self._trim()
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = Thread(target=self._run, name="login-events-flush", daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            try:
+                self.collection.insert_many(batch, ordered=False)
+            except errors.BulkWriteError as b:
+                # The rest of the batch was written, duplicates are events already written by a previous, interrupted flush
+                retry = [batch[error['index']] for error in b.details['writeErrors'] if error.get('code') != 11000]
+                self._requeue(retry, None)
+            except Exception as e:
+                self._requeue(pending[start:], e)
+                return
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval)
+        self.flush()
+
+    def recent(self, record_id:str=None, username:str=None, limit:int=50) -> list:
+        """Return the latest flushed events of a record ID or username (newest first), e.g. to review the failed attempts on an account."""
+        query = {"user_id": record_id} if record_id is not None else {"username": username}
+        return list(self.collection.find(query, {"_id": 0}).sort("created_at", -1).limit(limit))
+
+    def _requeue(self, events:list, error) -> None:
+        with self._lock:
+            self._pending[:0] = events
+            self._trim()
+        if error is not None:
+            print(f"📤 | Events Error: unable to write login events, they will be retried\n🚧 | {error}\n")
+
+    def _trim(self) -> None:
+        overflow = len(self._pending) - self.max_buffer
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+# Shared login event log, the flush interval & buffer size can be tuned from the .env file
+login_events = EventLog(events_collection, float(config.get('events_flush_interval') or 2), int(config.get('events_batch_size') or 1000), int(config.get('events_max_buffer') or 10000))
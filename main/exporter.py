@@ -0,0 +1,139 @@
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+from db_module import users_collection
+from classes import _FIELDS
+
+# Fields exported by default, the password hash is only exported when it is requested
+DEFAULT_FIELDS = [field for field in _FIELDS if field != "password"]
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def stream_users(fields:list=None, role:str=None, account_state:bool=None, resume_after:str=None, batch_size:int=1000, users=users_collection):
+    """
+    This "Block" streams the user records in "_id" order, through a batched and projected cursor, so only one batch is held in memory at a time. Every role and/or state filter has an index ending with "_id" (see schema.py), so the records are read in order from the index instead of being sorted in memory.
+
+    Parameters:
+        fields (list): The record fields to export, the "_id" is always included (default is DEFAULT_FIELDS).
+        role (str): Only export the records with this role.
+        account_state (bool): Only export the records with this account state.
+        resume_after (str): Only export the records whose "_id" comes after this one, to resume an interrupted export.
+        batch_size (int): Number of records fetched per round trip (default is 1000).
+        users: The users collection (default is db_module.users_collection).
+
+    Yields:
+        dict: The next record, with its dates formatted as YYYY-MM-DD.
+    """
+    if fields is None:
+        fields = DEFAULT_FIELDS
+    query = {}
+    if role is not None:
+        query['role'] = role.lower()
+    if account_state is not None:
+        query['account_state'] = account_state
+    if resume_after is not None:
+        query['_id'] = {"$gt": resume_after}
+    cursor = users.find(query, {field: 1 for field in fields}).sort("_id", 1).batch_size(batch_size)
+    try:
+        for record in cursor:
+            yield {field: _serialize(record.get(field)) for field in ["_id"] + list(fields)}
+    finally:
+        cursor.close()
+
+
+def export_users(path:str, fields:list=None, role:str=None, account_state:bool=None, resume:bool=False, batch_size:int=1000, users=users_collection) -> dict:
+    """
+    This "Block" exports the user records to a JSONL or CSV file, with bounded memory, e.g. for backups and analytics extracts.
+
+    In Detail:
+        1. Files ending with ".jsonl" or ".json" are written as one JSON object per line, any other file is written as CSV with a header row.
+        2. The records are streamed by stream_users() and written as they arrive.
+        3. After every batch, the file is flushed and a "<path>.checkpoint" file saves the last exported "_id", the file offset it ends at, and the fields & filters of the export. It is removed once the export completes.
+        4. With resume=True, the file is truncated to the checkpointed offset, which drops the rows written after the last checkpoint (and any partial line), then the export continues after the checkpointed "_id".
+
+    Parameters:
+        path (str): The output file.
+        fields, role, account_state, batch_size, users: See stream_users().
+        resume (bool): Continue an interrupted export (default is False). Without a checkpoint file, the export starts over.
+
+    Returns:
+        dict: The export report, with the "exported" count and the "last_id" exported.
+
+    Raises:
+        ValueError: Raised when resuming with other fields or filters than the checkpointed export, or if the file is shorter than the checkpointed offset.
+    """
+    if fields is None:
+        fields = DEFAULT_FIELDS
+    checkpoint = path + ".checkpoint"
+    settings = {"fields": list(fields), "role": role, "account_state": account_state}
+    saved = None
+    if resume and os.path.exists(checkpoint) and os.path.exists(path):
+        with open(checkpoint, encoding="utf-8") as file:
+            saved = json.load(file)
+        if saved['settings'] != settings:
+            raise ValueError(f"the checkpoint was made with other fields or filters: {saved['settings']}")
+        if os.path.getsize(path) < saved['offset']:
+            raise ValueError(f"{path} is shorter than its checkpoint, it can't be resumed")
+    resume_after = saved['last_id'] if saved is not None else None
+    exported, last_id = 0, resume_after
+    with open(path, "r+" if saved is not None else "w", newline="", encoding="utf-8") as file:
+        if saved is not None:
+            # The rows written after the last checkpoint are exported again, they are dropped first
+            file.seek(saved['offset'])
+            file.truncate()
+        if path.endswith((".jsonl", ".json")):
+            write = lambda record: file.write(json.dumps(record) + "\n")
+        else:
+            writer = csv.DictWriter(file, fieldnames=["_id"] + list(fields))
+            if saved is None:
+                writer.writeheader()
+            write = writer.writerow
+        for record in stream_users(fields, role, account_state, resume_after, batch_size, users):
+            write(record)
+            exported += 1
+            last_id = record['_id']
+            if exported % batch_size == 0:
+                file.flush()
+                _saveCheckpoint(checkpoint, {"last_id": last_id, "offset": file.tell(), "settings": settings})
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return {"exported": exported, "last_id": last_id}
+
+
+def _saveCheckpoint(checkpoint:str, state:dict) -> None:
+    # Written to a temporary file first, so a crash never leaves a truncated checkpoint behind
+    temporary = checkpoint + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+    os.replace(temporary, checkpoint)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export users to a JSONL or CSV file.")
+    parser.add_argument("path", help="output file, .jsonl for JSON lines, anything else for CSV")
+    parser.add_argument("--fields", help=f"comma separated fields to export (default is {','.join(DEFAULT_FIELDS)})")
+    parser.add_argument("--role", help="only export the records with this role")
+    parser.add_argument("--state", choices=["active", "inactive"], help="only export the active or inactive records")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted export from its checkpoint")
+    parser.add_argument("--batch-size", type=int, default=1000, help="records fetched per round trip (default is 1000)")
+    arguments = parser.parse_args()
+    fields = arguments.fields.split(",") if arguments.fields else None
+    account_state = None if arguments.state is None else arguments.state == "active"
+    print("🔃 | Exporting records..\n")
+    try:
+        report = export_users(arguments.path, fields, arguments.role, account_state, arguments.resume, arguments.batch_size)
+    except ValueError as v:
+        print(f"🔤 | Resume Error: {v}\n")
+        return
+    print(f"✅ | Export completed: {report['exported']} record(s) exported, last ID {report['last_id']}\n")
+
+
+if __name__ == "__main__":
+    main()
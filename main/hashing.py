@@ -0,0 +1,222 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from db_module import config
+
+
+def _encode(data:bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _decode(data:str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+class PasswordHasher(ABC):
+    """
+    Summary of the PasswordHasher Class:
+        The PasswordHasher class is the base of the password hashers. A hasher turns a password into an encoded string that stores the algorithm, its parameters, the salt and the hash, so every record can be verified with the parameters it was hashed with.
+
+    Key Attributes:
+        algorithm: The name of the algorithm, it is the first part of the encoded string.
+
+    Methods:
+        hash: Hashes a password with a new random salt, and returns the encoded string.
+        verify: Checks a password against an encoded string produced by the same algorithm.
+        needsRehash: Checks whether an encoded string was produced with different parameters than the hasher's current ones.
+        stronger: Returns a hasher of the same algorithm with about twice the cost, it is used by calibrate().
+
+    Notes:
+        - The methods are abstract, a hasher that doesn't implement all of them fails when it is created rather than on the first login.
+    """
+    algorithm = None
+
+    @abstractmethod
+    def hash(self, password:str) -> str:
+        ...
+
+    @abstractmethod
+    def verify(self, password:str, encoded:str) -> bool:
+        ...
+
+    @abstractmethod
+    def needsRehash(self, encoded:str) -> bool:
+        ...
+
+    @abstractmethod
+    def stronger(self):
+        ...
+
+
+class ScryptHasher(PasswordHasher):
+    """
+    Summary of the ScryptHasher Class:
+        Hashes passwords with hashlib.scrypt, encoded as "scrypt$n=<n>,r=<r>,p=<p>$<salt>$<hash>".
+
+    Key Attributes:
+        n: CPU/memory cost, a power of 2 (default is 2**14).
+        r: Block size (default is 8).
+        p: Parallelization (default is 1).
+    """
+    algorithm = "scrypt"
+
+    def __init__(self, n:int=2**14, r:int=8, p:int=1) -> None:
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def _derive(self, password:str, salt:bytes, n:int, r:int, p:int) -> bytes:
+        return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=32)
+
+    def _parse(self, encoded:str) -> tuple:
+        algorithm, params, salt, hashed = encoded.split("$")
+        params = dict(param.split("=") for param in params.split(","))
+        return int(params['n']), int(params['r']), int(params['p']), _decode(salt), _decode(hashed)
+
+    def hash(self, password:str) -> str:
+        salt = os.urandom(16)
+        return f"{self.algorithm}$n={self.n},r={self.r},p={self.p}${_encode(salt)}${_encode(self._derive(password, salt, self.n, self.r, self.p))}"
+
+    def verify(self, password:str, encoded:str) -> bool:
+        n, r, p, salt, hashed = self._parse(encoded)
+        return hmac.compare_digest(self._derive(password, salt, n, r, p), hashed)
+
+    def needsRehash(self, encoded:str) -> bool:
+        return self._parse(encoded)[:3] != (self.n, self.r, self.p)
+
+    def stronger(self):
+        return ScryptHasher(self.n * 2, self.r, self.p)
+
+
+class PBKDF2Hasher(PasswordHasher):
+    """
+    Summary of the PBKDF2Hasher Class:
+        Hashes passwords with hashlib.pbkdf2_hmac (SHA-256), encoded as "pbkdf2_sha256$<iterations>$<salt>$<hash>".
+
+    Key Attributes:
+        iterations: Number of iterations (default is 600000).
+    """
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations:int=600000) -> None:
+        self.iterations = iterations
+
+    def _derive(self, password:str, salt:bytes, iterations:int) -> bytes:
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+    def hash(self, password:str) -> str:
+        salt = os.urandom(16)
+        return f"{self.algorithm}${self.iterations}${_encode(salt)}${_encode(self._derive(password, salt, self.iterations))}"
+
+    def verify(self, password:str, encoded:str) -> bool:
+        algorithm, iterations, salt, hashed = encoded.split("$")
+        return hmac.compare_digest(self._derive(password, _decode(salt), int(iterations)), _decode(hashed))
+
+    def needsRehash(self, encoded:str) -> bool:
+        return int(encoded.split("$")[1]) != self.iterations
+
+    def stronger(self):
+        return PBKDF2Hasher(self.iterations * 2)
+
+
+HASHERS = {ScryptHasher.algorithm: ScryptHasher, PBKDF2Hasher.algorithm: PBKDF2Hasher}
+
+
+def calibrate(target_ms:float, hasher:PasswordHasher=None) -> PasswordHasher:
+    """
+    Summary of the calibrate Function:
+        The calibrate function finds the hasher parameters whose hashing time on this machine is closest to a target latency, so the hashing cost can be kept within the login budget.
+
+    Parameters:
+        target_ms (float): The target hashing time, in milliseconds.
+        hasher (PasswordHasher): The starting hasher, its cost is doubled until the target is reached (default is a ScryptHasher with n=2**10).
+
+    Function Steps:
+        1. Measure: Hashes a sample password with the current hasher.
+        2. Strengthen: Doubles the cost while the measured time is below the target.
+        3. Pick: Returns the hasher whose measured time is the closest to the target.
+
+    Returns:
+        PasswordHasher: The calibrated hasher, use it with setHasher().
+    """
+    if hasher is None:
+        hasher = ScryptHasher(2**10)
+    best, best_gap = hasher, None
+    while True:
+        started = perf_counter()
+        hasher.hash("calibration-password")
+        elapsed = (perf_counter() - started) * 1000
+        gap = abs(elapsed - target_ms)
+        if best_gap is None or gap < best_gap:
+            best, best_gap = hasher, gap
+        if elapsed >= target_ms:
+            return best
+        hasher = hasher.stronger()
+
+
+def _defaultHasher() -> PasswordHasher:
+    if (config.get('password_hasher') or "scrypt") == PBKDF2Hasher.algorithm:
+        return PBKDF2Hasher(int(config.get('pbkdf2_iterations') or 600000))
+    return ScryptHasher(int(config.get('scrypt_n') or 2**14), int(config.get('scrypt_r') or 8), int(config.get('scrypt_p') or 1))
+
+
+# The hasher used for new passwords, it can be chosen & tuned from the .env file, or replaced with setHasher()
+current_hasher = _defaultHasher()
+# Threads used by the async helpers, hashlib releases the GIL while hashing so they run in parallel
+_executor = ThreadPoolExecutor(max_workers=int(config.get('hash_workers') or 4), thread_name_prefix="password-hasher")
+
+
+def setHasher(hasher:PasswordHasher) -> None:
+    """Replace the hasher used for new passwords, records hashed with other parameters are rehashed on their next login."""
+    global current_hasher
+    current_hasher = hasher
+
+
+def hashPassword(password:str) -> str:
+    """Hash a password with the current hasher, and return the encoded string to be stored."""
+    return current_hasher.hash(password)
+
+
+def verifyPassword(password:str, encoded:str) -> tuple:
+    """
+    Summary of the verifyPassword Function:
+        The verifyPassword function checks a password against a stored password, whatever hasher it was stored with.
+
+    Parameters:
+        password (str): The provided password.
+        encoded (str): The stored password, an encoded hash or a legacy plaintext password. A stored password that looks like an encoded hash but can't be parsed is compared as plaintext.
+
+    Returns:
+        tuple: (verified, needs_rehash). needs_rehash is True if the password is correct but was stored in plaintext, with another algorithm, or with other parameters than the current hasher, so the caller can store hashPassword(password) instead.
+    """
+    hasher = HASHERS.get(encoded.split("$", 1)[0]) if "$" in encoded else None
+    if hasher is not None:
+        try:
+            if type(current_hasher) is hasher:
+                if not current_hasher.verify(password, encoded):
+                    return False, False
+                return True, current_hasher.needsRehash(encoded)
+            return hasher().verify(password, encoded), True
+        except (KeyError, ValueError):
+            pass  # Not an encoded hash after all, e.g. a legacy plaintext password starting with "scrypt$"
+    return hmac.compare_digest(password.encode("utf-8"), encoded.encode("utf-8")), True
+
+
+async def runHashing(function, *args):
+    """Run a function that hashes passwords in the hashing thread pool, so it doesn't stall the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, function, *args)
+
+
+async def hashPasswordAsync(password:str) -> str:
+    """Async hashPassword(), run in the hashing thread pool."""
+    return await runHashing(hashPassword, password)
+
+
+async def verifyPasswordAsync(password:str, encoded:str) -> tuple:
+    """Async verifyPassword(), run in the hashing thread pool."""
+    return await runHashing(verifyPassword, password, encoded)
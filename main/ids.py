@@ -0,0 +1,136 @@
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from threading import Lock
+from time import time
+from uuid import uuid4
+from bson import ObjectId
+from db_module import config
+
+# Crockford's base32 alphabet, it keeps the lexicographic order of the encoded numbers
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+class IDGenerator(ABC):
+    """
+    Summary of the IDGenerator Class:
+        The IDGenerator class is the base of the record ID generators. A generator returns unique string IDs, the time-ordered ones grow with the creation time so new records are appended to the right edge of the "_id" index.
+
+    Key Attributes:
+        name: The name of the generator, used to choose it from the .env file.
+
+    Methods:
+        next_id: Returns a new ID.
+        next_ids: Returns n new IDs at once, for the bulk paths (e.g. importer.py).
+
+    Notes:
+        - next_id is abstract, a generator that doesn't implement it fails when it is created rather than on the first insert.
+    """
+    name = None
+
+    @abstractmethod
+    def next_id(self) -> str:
+        ...
+
+    def next_ids(self, n:int) -> list:
+        return [self.next_id() for _ in range(n)]
+
+
+class ULIDGenerator(IDGenerator):
+    """
+    Summary of the ULIDGenerator Class:
+        The ULIDGenerator class generates ULIDs: 26 characters of Crockford's base32, a 48-bit millisecond timestamp followed by 80 random bits. The IDs are fixed-width and sort by creation time, and a range of "_id"s is a range of creation times.
+
+    Notes:
+        - IDs generated within the same millisecond increment the random part of the previous one, so the IDs of one process are strictly increasing, even in a batch.
+        - The generator is shared across threads, it is guarded by a lock.
+    """
+    name = "ulid"
+
+    def __init__(self) -> None:
+        self._last_time = 0
+        self._last_random = 0
+        self._lock = Lock()
+
+    def next_id(self) -> str:
+        return self.next_ids(1)[0]
+
+    def next_ids(self, n:int) -> list:
+        with self._lock:
+            now = int(time() * 1000)
+            if now > self._last_time:
+                self._last_time = now
+                self._last_random = int.from_bytes(os.urandom(10), "big") & ~(0xFFFF << 64)  # the top 16 bits are cleared to leave room for the increments
+            values = range(self._last_random + 1, self._last_random + 1 + n)
+            self._last_random += n
+            prefix = self._last_time << 80
+        return [_base32(prefix | value) for value in values]
+
+    def floor(self, milliseconds:int) -> str:
+        """Return the lowest ULID of a millisecond, every ULID generated from that millisecond on sorts after it."""
+        return _base32(milliseconds << 80)
+
+    def timestamp(self, record_id:str) -> datetime:
+        """Return the creation time encoded in a ULID, as an aware UTC datetime."""
+        value = 0
+        for char in record_id[:10]:
+            value = value * 32 + _CROCKFORD.index(char)
+        return datetime.fromtimestamp(value / 1000, timezone.utc)
+
+
+class ObjectIdGenerator(IDGenerator):
+    """
+    Summary of the ObjectIdGenerator Class:
+        The ObjectIdGenerator class generates the hex string of a BSON ObjectId: 24 characters, a 32-bit seconds timestamp, a per-process random value and an incrementing counter. It is MongoDB's own default "_id" format.
+    """
+    name = "objectid"
+
+    def next_id(self) -> str:
+        return str(ObjectId())
+
+    def timestamp(self, record_id:str) -> datetime:
+        """Return the creation time encoded in an ObjectId, as an aware UTC datetime."""
+        return ObjectId(record_id).generation_time
+
+
+class LegacyGenerator(IDGenerator):
+    """
+    Summary of the LegacyGenerator Class:
+        The LegacyGenerator class generates the original record IDs: the unpadded year, month and day, followed by "1" and 11 characters of an uppercased UUID4. They aren't time-ordered nor fixed-width, it is only kept for deployments that rely on this format.
+    """
+    name = "legacy"
+
+    def next_id(self) -> str:
+        getDate = datetime.today()
+        generateUUID = str(uuid4()).upper()
+        return str(str(getDate.year) + str(getDate.month) + str(getDate.day) + "1" + (generateUUID[-12:-1]))
+
+
+def _base32(value:int) -> str:
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+# Generators by their name
+GENERATORS = {generator.name: generator for generator in [ULIDGenerator, ObjectIdGenerator, LegacyGenerator]}
+# The generator of the new record IDs, it can be chosen from the .env file, or replaced with setGenerator()
+current_generator = GENERATORS.get(config.get('id_generator') or "ulid", ULIDGenerator)()
+
+
+def setGenerator(generator:IDGenerator) -> None:
+    """Replace the generator used for new record IDs, the existing records keep their IDs."""
+    global current_generator
+    current_generator = generator
+
+
+def generateID() -> str:
+    """Generate the ID of a new user record with the current generator."""
+    return current_generator.next_id()
+
+
+def generateIDs(n:int) -> list:
+    """Generate the IDs of n new user records at once, in increasing order for the time-ordered generators."""
+    return current_generator.next_ids(n)
@@ -0,0 +1,124 @@
+import argparse
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from db_module import users_collection
+from classes import User, _accountRecord
+import hashing
+from ids import generateIDs
+from validation import ACCOUNT_FIELDS, validate_many
+
+# Columns/keys of an imported row, "role" is optional
+COLUMNS = ["username", "password", "first_name", "last_name", "dob", "gender", "role"]
+
+
+def read_rows(path:str):
+    """
+    This "Block" streams the rows of a CSV or JSONL file, one dict at a time, so the file is never fully loaded in memory.
+
+    In Detail:
+        - Files ending with ".jsonl" or ".json" are read as one JSON object per line, blank lines are skipped.
+        - A line that isn't valid JSON yields a ValueError in place of its row, so import_users reports it with its row number and carries on with the next lines.
+        - Any other file is read as a CSV file with a header row (see COLUMNS).
+
+    Yields:
+        dict: The next row (or a ValueError for a malformed JSON line).
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith((".jsonl", ".json")):
+            for line_number, line in enumerate(file, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as j:
+                        yield ValueError(f"line {line_number} isn't valid JSON: {j}")
+        else:
+            yield from csv.DictReader(file)
+
+
+def _rowRecord(row:dict) -> dict:
+    # Keeps the known columns only, an empty "role" falls back to the default role
+    return {column: row[column] for column in COLUMNS if row.get(column) not in (None, "")}
+
+
+def import_users(rows, batch_size:int=1000, workers:int=None, users=users_collection) -> dict:
+    """
+    This "Block" imports users in bulk, e.g. to onboard a whole tenant, in constant memory.
+
+    In Detail:
+        1. The rows are consumed lazily in batches of batch_size.
+        2. Every batch is validated with validate_many (see validation.py), the same rules as create_new_account, before any database round trip.
+        3. The passwords of the valid rows are hashed in a ProcessPoolExecutor with the current hasher of this process, hashing is the CPU-bound part of an import.
+        4. The record IDs of a batch are generated at once (see ids.py), and its valid rows are written with a single unordered insert_many, so one duplicate doesn't stop the rest of the batch.
+        5. Duplicate usernames (rejected by the unique "username" index) and invalid rows are reported with their row number.
+        6. The account creations count is incremented once per batch.
+
+    Parameters:
+        rows: An iterable of dicts with the COLUMNS keys, e.g. read_rows(path). Any other item (e.g. the ValueError of a malformed line) is reported as an invalid row.
+        batch_size (int): Number of rows per insert_many (default is 1000).
+        workers (int): Number of worker processes used for hashing (default is the number of CPUs).
+        users: The users collection (default is db_module.users_collection).
+
+    Returns:
+        dict: The import report, with the "inserted" count, and the "duplicates" and "invalid" lists of {"row", "username", "error"} dicts. Row numbers start at 1.
+
+    Raises:
+        PyMongoError: Raised if the database can't be reached, the rows of the previous batches stay inserted.
+    """
+    report = {"inserted": 0, "duplicates": [], "invalid": []}
+    rows = iter(rows)
+    row_number = 0
+    hasher = hashing.current_hasher
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return report
+            valid, numbers = [], []
+            results = iter(validate_many([_rowRecord(row) for row in batch if isinstance(row, dict)], ACCOUNT_FIELDS))
+            for row in batch:
+                row_number += 1
+                if not isinstance(row, dict):
+                    # A malformed line (see read_rows) or a JSON value that isn't an object
+                    error = row if isinstance(row, Exception) else f"row must be an object, not {type(row).__name__}"
+                    report['invalid'].append({"row": row_number, "username": None, "error": str(error)})
+                    continue
+                values, error = next(results)
+                if error is not None:
+                    report['invalid'].append({"row": row_number, "username": row.get('username'), "error": str(error)})
+                else:
+                    valid.append(values)
+                    numbers.append(row_number)
+            # The hasher is sent to the workers with every chunk, so one set with hashing.setHasher() or calibrate() in this process is used
+            hashes = executor.map(hasher.hash, [values['password'] for values in valid], chunksize=max(1, len(valid) // 64))
+            records = [_accountRecord(values, password_hash, record_id) for values, password_hash, record_id in zip(valid, hashes, generateIDs(len(valid)))]
+            if not records:
+                continue
+            write_errors = User.insertMany(records, users)
+            for error in write_errors:
+                failure = {"row": numbers[error['index']], "username": records[error['index']].username, "error": error.get('errmsg', "")}
+                if error.get('code') == 11000:
+                    report['duplicates'].append(failure)
+                else:
+                    report['invalid'].append(failure)
+            report['inserted'] += len(records) - len(write_errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import users from a CSV or JSONL file.")
+    parser.add_argument("path", help="CSV file with a header row, or JSONL file (one object per line)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per insert_many (default is 1000)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes used for password hashing")
+    arguments = parser.parse_args()
+    print("🔃 | Importing records..\n")
+    report = import_users(read_rows(arguments.path), arguments.batch_size, arguments.workers)
+    for failure in report['duplicates']:
+        print(f"⚠️ | Row {failure['row']}: the username '{failure['username']}' is already registered")
+    for failure in report['invalid']:
+        print(f"🔤 | Row {failure['row']}: {failure['error']}")
+    print(f"\n✅ | Import completed: {report['inserted']} inserted, {len(report['duplicates'])} duplicate(s), {len(report['invalid'])} invalid\n")
+
+
+if __name__ == "__main__":
+    main()
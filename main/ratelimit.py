@@ -0,0 +1,176 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from time import time
+from pymongo import ReturnDocument
+from db_module import activity_collection, config
+
+
+class MemoryBackend:
+    """
+    Summary of the MemoryBackend Class:
+        The MemoryBackend class keeps the rate limiter counters in process memory. It is the default backend, the limits then apply per process.
+
+    Key Attributes:
+        max_keys: Maximum number of keys tracked, the least recently used key is forgotten first, so spraying random usernames can't exhaust the memory.
+
+    Methods:
+        increment: Counts an attempt of a key, and returns its (current window count, previous window count, locked until) triple.
+        lock: Locks a key until a timestamp.
+        lockedUntil: Returns the timestamp a key is locked until, 0 if it isn't locked.
+        reset: Forgets a key.
+    """
+
+    def __init__(self, max_keys:int=100000) -> None:
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        self._lock = Lock()
+
+    def increment(self, key:str, index:int, window:float) -> tuple:
+        with self._lock:
+            state = self._state(key, index)
+            if state[0] != index:
+                state[2] = state[1] if state[0] == index - 1 else 0
+                state[0], state[1] = index, 0
+            state[1] += 1
+            return state[1], state[2], state[3]
+
+    def lock(self, key:str, until:float, window:float) -> None:
+        with self._lock:
+            state = self._state(key, 0)
+            state[3] = max(state[3], until)
+
+    def lockedUntil(self, key:str) -> float:
+        with self._lock:
+            state = self._keys.get(key)
+            return 0.0 if state is None else state[3]
+
+    def reset(self, key:str) -> None:
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def _state(self, key:str, index:int) -> list:
+        # [window index, current count, previous count, locked until]
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = [index, 0, 0, 0.0]
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+        return state
+
+
+class MongoBackend:
+    """
+    Summary of the MongoBackend Class:
+        The MongoBackend class keeps the rate limiter counters in the activity_collection, so the limits are shared by every app node.
+
+    Key Attributes:
+        collection: The collection holding the counters documents (default is db_module.activity_collection).
+
+    Notes:
+        - Every key is one "rl:<key>" document, an attempt is counted with a single pipeline find_one_and_update that also rolls the windows over, so it costs one round trip.
+        - The documents carry an "expires_at" date, the TTL index of schema.py removes the idle keys.
+    """
+
+    def __init__(self, collection=activity_collection) -> None:
+        self.collection = collection
+
+    def increment(self, key:str, index:int, window:float) -> tuple:
+        stage = {
+            "previous": {"$cond": [{"$eq": ["$index", index]}, "$previous", {"$cond": [{"$eq": ["$index", index - 1]}, "$current", 0]}]},
+            "current": {"$cond": [{"$eq": ["$index", index]}, {"$add": ["$current", 1]}, 1]},
+            "index": {"$literal": index},
+            "locked_until": {"$ifNull": ["$locked_until", 0.0]},
+            "expires_at": {"$literal": datetime.now(timezone.utc) + timedelta(seconds=2 * window)},
+        }
+        state = self.collection.find_one_and_update({"_id": "rl:" + key}, [{"$set": stage}], projection={"current": 1, "previous": 1, "locked_until": 1}, upsert=True, return_document=ReturnDocument.AFTER)
+        return state['current'], state['previous'], state['locked_until']
+
+    def lock(self, key:str, until:float, window:float) -> None:
+        expires_at = datetime.fromtimestamp(until, timezone.utc) + timedelta(seconds=2 * window)
+        self.collection.update_one({"_id": "rl:" + key}, {"$max": {"locked_until": until, "expires_at": expires_at}})
+
+    def reset(self, key:str) -> None:
+        self.collection.delete_one({"_id": "rl:" + key})
+
+
+class RateLimiter:
+    """
+    Summary of the RateLimiter Class:
+        The RateLimiter class limits the number of attempts per key (e.g. a username or a source address) with a sliding window, and locks a key out once it goes over its limit. It is checked before any users_collection query, so over-limit attempts are rejected without touching the database.
+
+    Key Attributes:
+        name: The prefix of the keys, so several limiters can share one backend.
+        limit: Maximum number of attempts per window.
+        window: Length of the sliding window, in seconds.
+        lockout: Number of seconds a key is rejected once it went over its limit (default is 0, the key is only rejected until the window slides).
+        backend: Where the counters are kept, MemoryBackend (per process) or MongoBackend (shared by every node).
+
+    Methods:
+        hit: Counts an attempt, and returns 0 if it is allowed, or the number of seconds to wait otherwise.
+        reset: Forgets the attempts and lockout of a key.
+
+    Notes:
+        - The sliding window is approximated from two fixed windows: the attempts of the current window, plus the attempts of the previous one weighted by how much of it is still covered. It costs two counters per key whatever the attempt rate.
+        - Lockouts are also cached locally, so a locked key is rejected without contacting the shared backend.
+        - If the shared backend can't be reached, the attempts are counted in memory instead, the limiter never blocks a login by itself.
+    """
+
+    def __init__(self, name:str, limit:int, window:float=60, lockout:float=0, backend=None) -> None:
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.lockout = lockout
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._fallback = self.backend if isinstance(self.backend, MemoryBackend) else MemoryBackend()
+        self._locked = MemoryBackend()
+
+    def hit(self, key:str) -> float:
+        key = f"{self.name}:{key}"
+        now = time()
+        locked_until = self._locked.lockedUntil(key)
+        if locked_until > now:
+            return locked_until - now
+        index = int(now // self.window)
+        try:
+            current, previous, locked_until = self.backend.increment(key, index, self.window)
+        except Exception:
+            current, previous, locked_until = self._fallback.increment(key, index, self.window)
+        if locked_until > now:
+            self._locked.lock(key, locked_until, self.window)
+            return locked_until - now
+        elapsed = now - index * self.window
+        if previous * (1 - elapsed / self.window) + current <= self.limit:
+            return 0
+        if self.lockout <= 0:
+            return self.window - elapsed
+        locked_until = now + self.lockout
+        self._locked.lock(key, locked_until, self.window)
+        try:
+            self.backend.lock(key, locked_until, self.window)
+        except Exception:
+            pass
+        return self.lockout
+
+    def reset(self, key:str) -> None:
+        key = f"{self.name}:{key}"
+        self._locked.reset(key)
+        self._fallback.reset(key)
+        self.backend.reset(key)
+
+
+def _backend():
+    if (config.get('rate_limit_backend') or "memory") == "mongo":
+        return MongoBackend(activity_collection)
+    return MemoryBackend(int(config.get('rate_limit_max_keys') or 100000))
+
+
+# Shared limiters of the login and signup attempts, the limits & backend can be tuned from the .env file
+_WINDOW = float(config.get('rate_limit_window') or 60)
+_LOCKOUT = float(config.get('rate_limit_lockout') or 300)
+rate_limit_backend = _backend()
+login_user_limiter = RateLimiter("login:user", int(config.get('login_attempts_per_user') or 10), _WINDOW, _LOCKOUT, rate_limit_backend)
+login_source_limiter = RateLimiter("login:source", int(config.get('login_attempts_per_source') or 100), _WINDOW, _LOCKOUT, rate_limit_backend)
+signup_source_limiter = RateLimiter("signup:source", int(config.get('signups_per_source') or 20), _WINDOW, _LOCKOUT, rate_limit_backend)
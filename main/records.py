@@ -0,0 +1,67 @@
+class UserRecord:
+    """
+    Summary of the UserRecord Class:
+        The UserRecord class is a lightweight, immutable user record, separated from the persistence. It uses __slots__, so it has no per-instance __dict__ and caches holding millions of records take a fraction of the memory of plain dicts or User instances.
+
+    Key Attributes:
+        id: Unique identifier of the record (the "_id" of its document).
+        username, password, first_name, last_name, dob, gender, role, account_state, comment: The record fields, with the same values as the users_collection documents. A field that wasn't fetched is None.
+
+    Methods:
+        from_document: Builds a record from a users_collection document (a missing field becomes None).
+        to_document: Returns the users_collection document of the record.
+        get: Returns a field by its document name, like dict.get.
+        replace: Returns a copy of the record with some fields changed.
+
+    Notes:
+        - Records can't be modified after they are built, so they can be shared between threads and cached without copies.
+    """
+    __slots__ = ("id", "username", "password", "first_name", "last_name", "dob", "gender", "role", "account_state", "comment")
+    FIELDS = __slots__[1:]
+
+    def __init__(self, id:str, username:str=None, password:str=None, first_name:str=None, last_name:str=None, dob=None, gender:str=None, role:str=None, account_state:bool=None, comment:str=None) -> None:
+        set_field = object.__setattr__
+        set_field(self, "id", id)
+        set_field(self, "username", username)
+        set_field(self, "password", password)
+        set_field(self, "first_name", first_name)
+        set_field(self, "last_name", last_name)
+        set_field(self, "dob", dob)
+        set_field(self, "gender", gender)
+        set_field(self, "role", role)
+        set_field(self, "account_state", account_state)
+        set_field(self, "comment", comment)
+
+    def __setattr__(self, name:str, value) -> None:
+        raise AttributeError("UserRecord is immutable, use replace() to get a changed copy")
+
+    def __delattr__(self, name:str) -> None:
+        raise AttributeError("UserRecord is immutable")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, UserRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        return f"UserRecord(id={self.id!r}, username={self.username!r}, role={self.role!r}, account_state={self.account_state!r})"
+
+    @classmethod
+    def from_document(cls, document:dict):
+        get = document.get
+        return cls(get("_id"), get("username"), get("password"), get("first_name"), get("last_name"), get("dob"), get("gender"), get("role"), get("account_state"), get("comment"))
+
+    def to_document(self) -> dict:
+        return {"_id": self.id, "username": self.username, "password": self.password, "first_name": self.first_name, "last_name": self.last_name, "dob": self.dob, "gender": self.gender, "role": self.role, "account_state": self.account_state, "comment": self.comment}
+
+    def get(self, field:str, default=None):
+        value = self.id if field == "_id" else getattr(self, field, None)
+        return default if value is None else value
+
+    def replace(self, **changes):
+        values = {field: getattr(self, field) for field in self.__slots__}
+        values.update(changes)
+        return UserRecord(**values)
@@ -0,0 +1,207 @@
+import argparse
+from pymongo import ASCENDING, DESCENDING, UpdateOne, errors
+from db_module import config, getDatabase
+from validation import normalize_username
+from bloom import CHANGES_TTL, username_filter
+
+
+class IndexSpec:
+    """
+    Summary of the IndexSpec Class:
+        The IndexSpec class declares one index the application relies on: the collection it belongs to, its keys and its options. The declared indexes (see INDEXES) are created and verified at startup by ensure_indexes().
+
+    Key Attributes:
+        collection: The name of the collection within the "authenticator" database.
+        keys: The (field, direction) pairs of the index.
+        name: The name of the index.
+        options: The create_index options, e.g. unique or expireAfterSeconds.
+    """
+
+    def __init__(self, collection:str, keys:list, name:str, **options) -> None:
+        self.collection = collection
+        self.keys = keys
+        self.name = name
+        self.options = options
+
+    def matches(self, info:dict) -> bool:
+        """Check whether an existing index (an index_information() entry) has the declared keys and options."""
+        if [(field, direction) for field, direction in info['key']] != self.keys:
+            return False
+        return all(info.get(option) == value for option, value in self.options.items())
+
+
+# Days a login event is kept before its TTL index removes it
+EVENT_TTL_DAYS = int(config.get('event_ttl_days') or 90)
+
+# Indexes the application relies on
+INDEXES = [
+    # Username lookups (login, signup, getByUsername) are index seeks, and the database enforces uniqueness
+    IndexSpec("users", [("username", ASCENDING)], "username_unique", unique=True),
+    # Role/state filtered exports (exporter.py) and admin listings are index seeks already in "_id" order, without an in-memory sort
+    IndexSpec("users", [("role", ASCENDING), ("account_state", ASCENDING), ("_id", ASCENDING)], "role_account_state_id"),
+    IndexSpec("users", [("role", ASCENDING), ("_id", ASCENDING)], "role_id"),
+    IndexSpec("users", [("account_state", ASCENDING), ("_id", ASCENDING)], "account_state_id"),
+    # Idle rate limiter keys (see ratelimit.MongoBackend) expire on their own, the activity counters have no "expires_at"
+    IndexSpec("activity", [("expires_at", ASCENDING)], "expires_at_ttl", expireAfterSeconds=0),
+    # Login events expire on their own
+    IndexSpec("login_events", [("created_at", ASCENDING)], "created_at_ttl", expireAfterSeconds=EVENT_TTL_DAYS * 86400),
+    # Sessions and revocations expire with the tokens they concern, and the revocations are synced by their time
+    IndexSpec("sessions", [("expires_at", ASCENDING)], "expires_at_ttl", expireAfterSeconds=0),
+    IndexSpec("sessions", [("revoked_at", ASCENDING)], "revoked_at", sparse=True),
+    # The latest events of an account (EventLog.recent) are read without sorting the whole collection
+    IndexSpec("login_events", [("user_id", ASCENDING), ("created_at", DESCENDING)], "user_id_created_at"),
+    # The username changes read by the username filters (see bloom.py) expire on their own
+    IndexSpec("username_changes", [("created_at", ASCENDING)], "created_at_ttl", expireAfterSeconds=CHANGES_TTL),
+]
+
+
+def ensure_indexes(database=None, indexes:list=INDEXES) -> list:
+    """
+    Summary of the ensure_indexes Function:
+        The ensure_indexes function creates the declared indexes that are missing, and verifies the existing ones. It is idempotent, so it runs on every startup (see db_module._bootstrap).
+
+    Parameters:
+        database: The database (default is db_module.getDatabase()).
+        indexes (list): The declared IndexSpec (default is INDEXES).
+
+    Function Steps:
+        1. Existing Indexes: Reads the existing indexes of every collection once, with index_information().
+        2. Verify: An existing index with the declared keys and options is reported as "ok".
+        3. Update TTL: An existing TTL index with another expiration is updated in place with collMod, without rebuilding it, and reported as "updated".
+        4. Create: A missing index is created and reported as "created".
+        5. Conflicts: An existing index with the same name but other keys or options is left untouched and reported as "conflict", it has to be dropped by hand.
+
+    Returns:
+        list: One {"collection", "name", "status", "error"} dict per declared index, status is "ok", "created", "updated", "conflict" or "failed".
+
+    Error Handling:
+        A failure (e.g. duplicated usernames preventing the unique index) is reported as "failed" with its error, the other indexes are still processed.
+    """
+    if database is None:
+        database = getDatabase()
+    existing = {}
+    report = []
+    for spec in indexes:
+        status, error = "ok", None
+        try:
+            if spec.collection not in existing:
+                existing[spec.collection] = database[spec.collection].index_information()
+            info = existing[spec.collection].get(spec.name)
+            if info is None:
+                database[spec.collection].create_index(spec.keys, name=spec.name, **spec.options)
+                status = "created"
+            elif not spec.matches(info):
+                ttl = spec.options.get('expireAfterSeconds')
+                if ttl is not None and "expireAfterSeconds" in info and [(field, direction) for field, direction in info['key']] == spec.keys:
+                    database.command("collMod", spec.collection, index={"name": spec.name, "expireAfterSeconds": ttl})
+                    status = "updated"
+                else:
+                    status = "conflict"
+                    error = f"existing index has the keys {info['key']} and different options"
+        except errors.PyMongoError as e:
+            status, error = "failed", str(e)
+        report.append({"collection": spec.collection, "name": spec.name, "status": status, "error": error})
+    return report
+
+
+def index_report(database=None, indexes:list=INDEXES) -> list:
+    """
+    Summary of the index_report Function:
+        The index_report function reports how every index of the declared collections is used, from the "$indexStats" aggregation stage, so missing and unused indexes can be spotted.
+
+    Returns:
+        list: One {"collection", "name", "declared", "exists", "accesses", "since"} dict per index. A declared index that doesn't exist has "exists" False, and an existing index with 0 "accesses" hasn't been used since "since" (the last server restart or index creation).
+
+    Raises:
+        PyMongoError: Raised if the database can't be reached, or if "$indexStats" isn't allowed for the user.
+    """
+    if database is None:
+        database = getDatabase()
+    declared = {(spec.collection, spec.name) for spec in indexes}
+    report = []
+    for collection in sorted({spec.collection for spec in indexes}):
+        found = set()
+        for stats in database[collection].aggregate([{"$indexStats": {}}]):
+            found.add(stats['name'])
+            report.append({"collection": collection, "name": stats['name'], "declared": (collection, stats['name']) in declared or stats['name'] == "_id_", "exists": True, "accesses": stats['accesses']['ops'], "since": stats['accesses']['since']})
+        for spec in indexes:
+            if spec.collection == collection and spec.name not in found:
+                report.append({"collection": collection, "name": spec.name, "declared": True, "exists": False, "accesses": 0, "since": None})
+    return report
+
+
+def normalize_usernames(database=None, batch_size:int=1000) -> dict:
+    """
+    Summary of the normalize_usernames Function:
+        The normalize_usernames function migrates the usernames that were stored before the usernames were normalized (e.g. a mixed-case username set by an older setUsername), so every record can be found by the case-insensitive lookups.
+
+    Parameters:
+        database: The database (default is db_module.getDatabase()).
+        batch_size (int): Number of updates sent per bulk_write (default is 1000).
+
+    Function Steps:
+        1. Scan: Streams the "username" of every record through a projected cursor.
+        2. Update: Every non-canonical username is replaced by its canonical form, with unordered bulk_write batches. An update only applies if the username wasn't changed meanwhile.
+        3. Conflicts: A canonical username that is already registered is rejected by the unique "username" index, the record is left untouched and reported.
+
+    Returns:
+        dict: The migration report, with the "normalized" count and the "conflicts" list of {"_id", "username"} dicts.
+    """
+    if database is None:
+        database = getDatabase()
+    users = database['users']
+    report = {"normalized": 0, "conflicts": []}
+    operations, pending = [], []
+
+    def flush():
+        # The canonical usernames are published to the username filters first (see bloom.py), like any other rename
+        username_filter.addMany([normalize_username(record['username']) for record in pending])
+        try:
+            report['normalized'] += users.bulk_write(operations, ordered=False).modified_count
+        except errors.BulkWriteError as b:
+            report['normalized'] += b.details['nModified']
+            for error in b.details['writeErrors']:
+                report['conflicts'].append(pending[error['index']])
+        operations.clear()
+        pending.clear()
+
+    for record in users.find({}, {"username": 1}).batch_size(batch_size):
+        username = record.get('username')
+        if isinstance(username, str) and normalize_username(username) != username:
+            operations.append(UpdateOne({"_id": record['_id'], "username": username}, {"$set": {"username": normalize_username(username)}}))
+            pending.append({"_id": record['_id'], "username": username})
+            if len(operations) >= batch_size:
+                flush()
+    if operations:
+        flush()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create the missing indexes and report how every index is used.")
+    parser.add_argument("--report-only", action="store_true", help="don't create or update any index")
+    parser.add_argument("--normalize-usernames", action="store_true", help="migrate the usernames stored before they were normalized")
+    arguments = parser.parse_args()
+    if arguments.normalize_usernames:
+        print("🔃 | Normalizing usernames..\n")
+        report = normalize_usernames()
+        for conflict in report['conflicts']:
+            print(f"⚠️ | Record {conflict['_id']}: the username '{conflict['username']}' is already registered in another case")
+        print(f"✅ | {report['normalized']} username(s) normalized, {len(report['conflicts'])} conflict(s)\n")
+    if not arguments.report_only:
+        print("🔃 | Verifying indexes..\n")
+        for index in ensure_indexes():
+            print(f"{'⚠️' if index['error'] else '✅'} | {index['collection']}.{index['name']}: {index['status']}" + (f"\n🚧 | {index['error']}" if index['error'] else ""))
+        print()
+    for index in index_report():
+        if not index['exists']:
+            print(f"🔎 | {index['collection']}.{index['name']}: missing")
+        elif index['accesses'] == 0:
+            print(f"💤 | {index['collection']}.{index['name']}: unused since {index['since']}" + ("" if index['declared'] else " (not declared in schema.py)"))
+        else:
+            print(f"📊 | {index['collection']}.{index['name']}: {index['accesses']} access(es) since {index['since']}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+from dataclasses import dataclass
+from pymongo import errors
+from db_module import users_collection
+from cache import user_cache
+from events import login_events
+from bloom import username_filter
+from sessions import session_manager
+from ratelimit import login_source_limiter, login_user_limiter, signup_source_limiter
+from classes import User, _prepareAccount
+from hashing import hashPassword, verifyPassword
+from validation import SCHEMA, normalize_username
+
+
+# Errors
+class AuthError(Exception):
+    """Base class of the errors raised by AuthService."""
+
+
+class ValidationError(AuthError, ValueError):
+    """Raised when a provided value doesn't meet its field's rule."""
+
+
+class DuplicateUsernameError(AuthError, ValueError):
+    """Raised when registering a username that is already registered."""
+
+
+class UnknownUserError(AuthError):
+    """Raised when no record matches the provided username."""
+
+
+class IncorrectPasswordError(AuthError):
+    """Raised when the provided password doesn't match the saved password."""
+
+
+class InactiveAccountError(AuthError):
+    """Raised when the account has been deactivated (account_state is False)."""
+
+
+class RateLimitedError(AuthError):
+    """Raised when too many attempts were made for a username or from a source, retry_after is the number of seconds to wait."""
+
+    def __init__(self, message:str, retry_after:float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Results
+@dataclass(frozen=True)
+class LoginResult:
+    record_id: str
+    username: str
+    token: str = None  # session token, see sessions.py
+
+
+@dataclass(frozen=True)
+class RegisterResult:
+    record_id: str
+    username: str
+
+
+class AuthService:
+    """
+    Summary of the AuthService Class:
+        The AuthService class is the headless authentication layer. It doesn't prompt or print anything, it returns typed results and raises typed errors, so it can be called at high rates from servers, workers and benchmarks. terminal.py is a thin, interactive client of it.
+
+    Key Attributes:
+        users: The users collection (default is db_module.users_collection).
+        events: The log every login attempt is recorded in (default is events.login_events).
+        usernames: The filter of the registered usernames (default is bloom.username_filter), a login for a username it has never seen is rejected without a users_collection query.
+        sessions: The session manager issuing a token on every successful login (default is sessions.session_manager).
+
+    Methods:
+        login: Verifies a username & password pair with one projected query, records the attempt and its outcome in the login event log, and returns a LoginResult. Passwords stored in plaintext or with outdated hasher parameters are transparently rehashed with the current hasher (see hashing.py).
+        register: Validates and inserts a new account, and returns a RegisterResult.
+    login & register are rate limited (see ratelimit.py) by username and by source before any users_collection query, so credential-stuffing traffic is shed without database work. A login username longer than any registered one is rejected as unknown before it is counted or recorded (see loginUsername).
+        authenticate: Returns the Session of a token issued by login, without any database query, or None if it is invalid, expired or revoked.
+        logout: Revokes a token.
+        usernameAvailable: Checks whether a username can still be registered, with the username filter first and an indexed point lookup for the possible hits.
+
+    Raises:
+        ValidationError, DuplicateUsernameError, UnknownUserError, IncorrectPasswordError, InactiveAccountError, RateLimitedError: All of them are AuthError subclasses.
+        PyMongoError: Database errors aren't wrapped, the caller decides how to report them.
+    """
+
+    def __init__(self, users=users_collection, events=login_events, usernames=username_filter, sessions=session_manager) -> None:
+        self.users = users
+        self.events = events
+        self.usernames = usernames
+        self.sessions = sessions
+
+    def login(self, username:str, password:str, source:str=None) -> LoginResult:
+        username = loginUsername(username)
+        retry_after = loginRetryAfter(username, source)
+        if retry_after:
+            self.events.record(None, username, "rate_limited", source)
+            raise RateLimitedError(f"too many login attempts, retry in {retry_after:.0f} seconds", retry_after)
+        record = None
+        if username is not None and self.usernames.mightExist(username):
+            record = self.users.find_one({"username": username}, {"username": 1, "password": 1, "account_state": 1})
+        if record is None:
+            self.events.record(None, username, "unknown_user", source)
+            raise UnknownUserError(f"no record matches the username '{username}'" if username is not None else "no record matches this username")
+        verified, needs_rehash = verifyPassword(password, record['password'])
+        if not verified:
+            self.events.record(record['_id'], username, "incorrect_password", source)
+            raise IncorrectPasswordError("incorrect password")
+        if record.get('account_state', True) == False:
+            self.events.record(record['_id'], username, "inactive", source)
+            raise InactiveAccountError("this account has been deactivated")
+        if needs_rehash:
+            self._rehash(record, password)
+        self.events.record(record['_id'], username, "verified", source)
+        return LoginResult(record['_id'], record['username'], self.sessions.issue(record['_id']))
+
+    def authenticate(self, token:str):
+        return self.sessions.verify(token)
+
+    def logout(self, token:str) -> bool:
+        return self.sessions.revoke(token)
+
+    def register(self, username:str, password:str, first_name:str, last_name:str, dob:str, gender:str, role:str="user", source:str=None) -> RegisterResult:
+        retry_after = signup_source_limiter.hit(source) if source is not None else 0
+        if retry_after:
+            raise RateLimitedError(f"too many signups, retry in {retry_after:.0f} seconds", retry_after)
+        try:
+            user = _prepareAccount(username, password, first_name, last_name, dob, gender, role)
+        except ValueError as v:
+            raise ValidationError(str(v)) from v
+        try:
+            User.insert(user, self.users, self.usernames)
+        except errors.DuplicateKeyError as d:
+            raise DuplicateUsernameError(f"username '{user.username}' is already registered") from d
+        return RegisterResult(user.id, user.username)
+
+    def _rehash(self, record:dict, password:str) -> None:
+        # Only replaces the stored hash if it wasn't changed meanwhile, a failure here must not fail the login
+        try:
+            self.users.update_one({"_id": record['_id'], "password": record['password']}, {"$set": {"password": hashPassword(password)}})
+            user_cache.invalidate(record['_id'])
+        except errors.PyMongoError:
+            pass
+
+    def usernameAvailable(self, username:str) -> bool:
+        username = normalize_username(username)
+        if not self.usernames.mightExist(username):
+            return True
+        return self.users.find_one({"username": username}, {"_id": 1}) is None
+
+
+def loginUsername(username:str):
+    """Return the normalized username of a login attempt, or None if it is longer than any username can be (see validation.py), so it never reaches the limiters, the username filter or the login event log."""
+    username = normalize_username(username)
+    return username if len(username) <= SCHEMA['username'].max_length else None
+
+
+def loginRetryAfter(username:str, source:str=None) -> float:
+    """Count a login attempt for a (normalized) username and its source, and return 0 if it is allowed, or the number of seconds to wait otherwise. A None username (see loginUsername) only counts for its source."""
+    retry_after = login_source_limiter.hit(source) if source is not None else 0
+    return retry_after or (login_user_limiter.hit(username) if username is not None else 0)
+
+
+# Shared service instance, used by terminal.py
+auth_service = AuthService()
@@ -0,0 +1,166 @@
+import atexit
+import base64
+import hashlib
+import hmac
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock, Thread
+from time import time
+from db_module import config, sessions_collection
+
+
+def _encode(data:bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _decode(data:str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _milliseconds() -> int:
+    return int(time() * 1000)
+
+
+@dataclass(frozen=True)
+class Session:
+    record_id: str
+    session_id: str
+    issued_at: int   # milliseconds since the epoch
+    expires_at: int  # milliseconds since the epoch
+
+
+class SessionManager:
+    """
+    Summary of the SessionManager Class:
+        The SessionManager class issues a signed session token on a successful login, and verifies tokens without any database query, so callers don't have to run login() again on every request they need to authenticate.
+
+    Key Attributes:
+        ttl: Number of seconds a token stays valid.
+        collection: Where the sessions & revocations are persisted (default is None, they are only kept in memory).
+        sync_interval: Number of seconds between two loads of the revocations persisted by the other nodes.
+
+    Methods:
+        issue: Returns a new token for a record ID.
+        verify: Returns the Session of a valid token, or None.
+        revoke: Revokes one token.
+        revokeUser: Revokes every token of a record ID issued until now, it is called when the password changes or the account is deactivated.
+        sync: Loads the revocations persisted since the last sync.
+
+    Notes:
+        - A token is "<payload>.<signature>", the payload (record ID, session ID, issue & expiry times) is signed with HMAC-SHA256 and the session_secret of the .env file. Every node sharing the secret accepts the same tokens.
+        - Verifying a token checks its signature, its expiry, the revoked sessions and the per-record "revoked before" times, all in memory. Revocations are kept until the tokens they concern expire.
+        - With a collection, every session and revocation is also written to it (a TTL index on "expires_at" removes them, see schema.py), and a background thread syncs the revocations of the other nodes every sync_interval seconds.
+    """
+
+    def __init__(self, secret:bytes, ttl:float=3600, collection=None, sync_interval:float=10) -> None:
+        self.ttl = ttl
+        self.collection = collection
+        self.sync_interval = sync_interval
+        self._secret = secret
+        self._revoked = {}
+        self._revoked_before = {}
+        self._synced_at = datetime.fromtimestamp(0, timezone.utc)
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread = None
+        atexit.register(self._stopped.set)
+
+    def issue(self, record_id:str) -> str:
+        issued_at = _milliseconds()
+        session = Session(record_id, _encode(os.urandom(12)), issued_at, issued_at + int(self.ttl * 1000))
+        payload = _encode(f"{session.record_id}\n{session.session_id}\n{session.issued_at}\n{session.expires_at}".encode("utf-8"))
+        if self.collection is not None:
+            self._startSync()
+            self.collection.insert_one({"_id": session.session_id, "user_id": record_id, "issued_at": self._date(issued_at), "expires_at": self._date(session.expires_at)})
+        return payload + "." + self._sign(payload)
+
+    def verify(self, token:str):
+        if self.collection is not None:
+            self._startSync()
+        try:
+            payload, signature = token.split(".")
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            record_id, session_id, issued_at, expires_at = _decode(payload).decode("utf-8").split("\n")
+            session = Session(record_id, session_id, int(issued_at), int(expires_at))
+        except (AttributeError, TypeError, ValueError):
+            return None
+        if session.expires_at <= _milliseconds():
+            return None
+        if session.session_id in self._revoked or session.issued_at <= self._revoked_before.get(session.record_id, -1):
+            return None
+        return session
+
+    def revoke(self, token:str) -> bool:
+        session = self.verify(token)
+        if session is None:
+            return False
+        with self._lock:
+            self._revoked[session.session_id] = session.expires_at
+        if self.collection is not None:
+            self.collection.update_one({"_id": session.session_id}, {"$set": {"revoked_at": datetime.now(timezone.utc)}})
+        return True
+
+    def revokeUser(self, record_id:str) -> None:
+        revoked_before = _milliseconds()
+        with self._lock:
+            self._revoked_before[record_id] = max(revoked_before, self._revoked_before.get(record_id, 0))
+            self._prune()
+        if self.collection is not None:
+            now = datetime.now(timezone.utc)
+            self.collection.update_one({"_id": "revoke:" + record_id}, {"$max": {"revoked_before": revoked_before, "revoked_at": now, "expires_at": self._date(revoked_before + int(self.ttl * 1000))}}, upsert=True)
+
+    def sync(self) -> None:
+        synced_at = datetime.now(timezone.utc)
+        # The window overlaps the previous one, so a node with a slightly late clock doesn't miss revocations
+        since = self._synced_at - timedelta(seconds=self.sync_interval)
+        for revocation in self.collection.find({"revoked_at": {"$gte": since}}, {"revoked_before": 1, "expires_at": 1}):
+            with self._lock:
+                if "revoked_before" in revocation:
+                    record_id = revocation['_id'][len("revoke:"):]
+                    self._revoked_before[record_id] = max(revocation['revoked_before'], self._revoked_before.get(record_id, 0))
+                else:
+                    self._revoked[revocation['_id']] = int(revocation['expires_at'].replace(tzinfo=timezone.utc).timestamp() * 1000)
+        self._synced_at = synced_at
+        with self._lock:
+            self._prune()
+
+    def _sign(self, payload:str) -> str:
+        return _encode(hmac.new(self._secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def _date(self, milliseconds:int) -> datetime:
+        return datetime.fromtimestamp(milliseconds / 1000, timezone.utc)
+
+    def _prune(self) -> None:
+        # Revocations of tokens that expired anyway are forgotten
+        now = _milliseconds()
+        self._revoked = {session_id: expires_at for session_id, expires_at in self._revoked.items() if expires_at > now}
+        oldest = now - int(self.ttl * 1000)
+        self._revoked_before = {record_id: revoked_before for record_id, revoked_before in self._revoked_before.items() if revoked_before > oldest}
+
+    def _startSync(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = Thread(target=self._run, name="session-sync", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"📤 | Session Error: unable to sync the revoked sessions, they will be retried\n🚧 | {e}\n")
+
+
+def _secret() -> bytes:
+    if config.get('session_secret'):
+        return config['session_secret'].encode("utf-8")
+    # Without a shared secret, the tokens are only valid within this process
+    return os.urandom(32)
+
+
+# Shared session manager, its secret, token lifetime & persistence can be set from the .env file
+session_manager = SessionManager(_secret(), float(config.get('session_ttl') or 3600), sessions_collection if (config.get('session_store') or "memory") == "mongo" else None, float(config.get('session_sync_interval') or 10))
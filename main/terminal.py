@@ -1,6 +1,7 @@
-from pymongo import CursorType, DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateOne, UpdateMany
+from pymongo import CursorType, DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateOne, UpdateMany, errors
 from db_module import users_collection, activity_collection
-from classes import User
+from service import DuplicateUsernameError, IncorrectPasswordError, InactiveAccountError, RateLimitedError, UnknownUserError, ValidationError, auth_service
+from validation import validate
 from uuid import uuid4
 
 def create_new_account() -> None:
@@ -10,8 +11,8 @@ def create_new_account() -> None:
     In detail:
         1. A request code is generated and the user must input the correct code to proceed.
         2. The user is prompted to enter their username, password, first name, last name, date of birth, and gender.
-        3. Various validations are performed to ensure the correctness of the entered data.
-        4. If all inputs are valid, a new user account is created and a record is inserted to the database through class "User".
+        3. Every input is checked right away against its rule from validation.py, the same rules used by the User class and the bulk paths.
+        4. If all inputs are valid, a new user account is created and a record is inserted to the database through AuthService.register() (see service.py).
 
     Raises:
         ValueError: Raised if any of the user inputs do not meet the required format or length.
@@ -40,108 +41,92 @@ def create_new_account() -> None:
             print(f"⚙️ | Create an Account - Panel Error: something went wrong, try again later..\n🚧 | {e}")
         else:
             print("\n✅ | Success!\n")
+            print("\nNow, provide the following information to create a new account:\n")
             try:
-                print("Loading..")
-                username_cache = []
-                fetch_usernames = users_collection.find({})
-                for i in fetch_usernames:
-                    username_cache.append(i['username'])
-            except Exception as e:
+                print("\nS1: username length should be at least 6 characters, without spaces, and unique")
+                usernameIn = str(input("Username › "))
+                validate("username", usernameIn)
+                if not auth_service.usernameAvailable(usernameIn):
+                    print("⚠️ | Existing Username: this username is already registered..")
+                    raise ValueError
+            except ValueError as v:
+                print(f"🔤 | Incorrect Value: enter a proper formatted username e.x. (Ahmed1234)..\n🚧 | Inappropriate argument value (of correct type or length)")
+            except errors.PyMongoError as e:
                 print(f"📤 | Connection Error: something went wrong, try again later..\n🚧 | {e}\n")
                 break
+            except Exception as e:
+                print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
             else:
-                print("\nNow, provide the following information to create a new account:\n")        
                 try:
-                    print("\nS1: username length should be more than 6 characters, and unique")
-                    usernameIn = str(input("Username › "))
-                    if len(usernameIn) < 6:
-                        raise ValueError
-                    elif usernameIn in username_cache:
-                        print("⚠️ | Existing Username: this username is already registered..")
-                        raise ValueError
+                    print("\nS2: password length should be at least 8 characters")
+                    passwordIn = str(input("Password › "))
+                    validate("password", passwordIn)
                 except ValueError as v:
-                    print(f"🔤 | Incorrect Value: enter a proper formatted username e.x. (Ahmed1234)..\n🚧 | Inappropriate argument value (of correct type or length)")
+                    print(f"🔤 | Incorrect Value: enter a proper formatted password..\n🚧 | Inappropriate argument value (of correct type or length)")
+                    
                 except Exception as e:
                     print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
                 else:
                     try:
-                        print("\nS2: password length should be more than 8 characters")
-                        passwordIn = str(input("Password › "))
-                        if len(passwordIn) < 8:
-                            raise ValueError
+                        print("\nS3: first name length should be at least 3 characters")
+                        fNameIn = str(input("First name › "))
+                        validate("first_name", fNameIn)
                     except ValueError as v:
-                        print(f"🔤 | Incorrect Value: enter a proper formatted password..\n🚧 | Inappropriate argument value (of correct type or length)")
-                        
+                        print(f"🔤 | Incorrect Value: enter a proper formatted first name..\n🚧 | Inappropriate argument value (of correct type or length)")
                     except Exception as e:
                         print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
                     else:
+                        print("ok")
                         try:
-                            print("\nS3: first name length should be more than 3 characters")
-                            fNameIn = str(input("First name › "))
-                            if len(fNameIn) < 3:
-                                raise ValueError
+                            print("\nS4: last name length should be at least 3 characters")
+                            lNameIn = str(input("Last name › "))
+                            validate("last_name", lNameIn)
                         except ValueError as v:
-                            print(f"🔤 | Incorrect Value: enter a proper formatted first name..\n🚧 | Inappropriate argument value (of correct type or length)")
+                            print(f"🔤 | Incorrect Value: enter a proper formatted last name..\n🚧 | Inappropriate argument value (of correct type or length)")
                         except Exception as e:
                             print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
                         else:
                             print("ok")
                             try:
-                                print("\nS4: last name length should be more than 3 characters")
-                                lNameIn = str(input("Last name › "))
-                                if len(lNameIn) < 3:
-                                    raise ValueError
+                                print("\nS5: date of birth should be in the following formate 'Year-Month-Day' using '-' to separate them")
+                
+                                dobIn = str(input("Date of Birth › "))
+                                validate("dob", dobIn)
                             except ValueError as v:
-                                print(f"🔤 | Incorrect Value: enter a proper formatted last name..\n🚧 | Inappropriate argument value (of correct type or length)")
+                                print(f"🔤 | Incorrect Value: enter a proper formatted date of birth e.x. 1999-6-27..\n🚧 | Inappropriate argument value (of correct type or length)")
                             except Exception as e:
                                 print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
                             else:
-                                print("ok")
                                 try:
-                                    print("\nS5: date of birth should be in the following formate 'Year-Month-Day' using '-' to separate them")
-                    
-                                    dobIn = str(input("Date of Birth › "))
-                                    dob_formation = dobIn.split("-")
-                                    if dobIn.count("-") < 2 or dobIn.count("-") > 2:
-                                        raise ValueError
-                                    else:
-                                        year = dob_formation[0]
-                                        month = dob_formation[1]
-                                        day = dob_formation[2]
-                                        if year.startswith("20") == False:
-                                            raise ValueError
-                                        
-                                        dobIn = year + "-" + month + "-" + day
+                                    print("\nS6: gender should be in the following formate 'male or female'")
+                                    genderIn = str(input("Gender › "))
+                                    validate("gender", genderIn)
                                 except ValueError as v:
-                                    print(f"🔤 | Incorrect Value: enter a proper formatted date of birth e.x. 1999-6-27..\n🚧 | Inappropriate argument value (of correct type or length)")
+                                    print(f"🔤 | Incorrect Value: enter a proper formatted gender e.x. 'female or male'..\n🚧 | Inappropriate argument value (of correct type, length, or formate)")
                                 except Exception as e:
                                     print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
                                 else:
                                     try:
-                                        print("\nS6: gender should be in the following formate 'male or female'")
-                                        gender_choices = ["Male", "Female"]
-                                        genderIn = str(input("Gender › "))
-                                        gender_formation = genderIn.capitalize()
-                                        if gender_formation not in gender_choices:
-                                            raise ValueError
-                                    except ValueError as v:
-                                        print(f"🔤 | Incorrect Value: enter a proper formatted gender e.x. 'female or male'..\n🚧 | Inappropriate argument value (of correct type, length, or formate)")
+                                        roleIn = "user"
                                     except Exception as e:
                                         print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
                                     else:
                                         try:
-                                            roleIn = "user"
+                                            print("🔃 | Inserting record..\n")
+                                            new_user = auth_service.register(usernameIn, passwordIn, fNameIn, lNameIn, dobIn, genderIn, roleIn, source="terminal")
+                                        except RateLimitedError as r:
+                                            print(f"⏳ | Too Many Signups: try again in {r.retry_after:.0f} seconds..\n")
+                                        except DuplicateUsernameError as d:
+                                            print(f"🔤 | Incorrect Value: this username was registered while you were signing up, try another one..\n🚧 | {d}")
+                                        except ValidationError as v:
+                                            print(f"🔤 | Incorrect Value: {v}..\n🚧 | Inappropriate argument value (of correct type, length, or formate)")
                                         except Exception as e:
-                                            print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {v}")
+                                            print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {e}")
                                         else:
-                                            try:
-                                                new_user = User(usernameIn, passwordIn, fNameIn, lNameIn, dobIn, genderIn, roleIn)
-                                            except Exception as e:
-                                                print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {e}")
-                                            else:
-                                                print("✅ | Account has been created successfully\n")
-                                                break
-                                    
+                                            print("Your record ID number is:", new_user.record_id,"\n")
+                                            print("✅ | Account has been created successfully\n")
+                                            break
+                                
         finally:
             print("🔃 | Returning to previous panel..\n")
 
@@ -151,13 +136,13 @@ def login() -> bool:
     This "Block" handles the process of logging in a user and verifying their credentials against our records.
 
     In Detail:
-        1. If the user has an account, they must input their username and password. The system will then attempt to verify these credentials.
-        2. If the user isn't registered and no matching records exist for the provided username, a UserWarning will be raised.
-        3. If the user is registered but the provided password is incorrect, an Exception will be raised indicating that the password is incorrect.
+        1. If the user has an account, they must input their username and password. The credentials are then verified by AuthService.login() (see service.py) in a single database round trip.
+        2. If the user isn't registered and no matching records exist for the provided username, an UnknownUserError is handled and the user is informed.
+        3. If the user is registered but the provided password is incorrect, an IncorrectPasswordError is handled and the user is informed.
+        4. If the account has been deactivated (account_state is False), an InactiveAccountError is handled and the login is refused.
     
     Raises:
         Exception (Case 1 & Case 2): This error will be raised if any random error occurs during the input of the username and password, helping to handle different errors and prevent the program from crashing.
-        UserWarning: This error will be raised if the provided password is incorrect and does not match the saved password.
         Exception (Case 3): This error will be raised if any errors occur while fetching the user record, helping to handle different errors and prevent the program from crashing.
     
     Returns:
@@ -180,31 +165,23 @@ def login() -> bool:
             print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {e}")
         else:
             try:
-                print("🔄 | Verifying entry..\n")
-                fetch_records = users_collection.count_documents({"username": usernameIn})
-                if fetch_records == 0:
-                    raise Exception
-                else:
-                    print("✅ | Entry verified\n")
-            except Exception as e :
+                print("🔄 | Verifying Username & Password..\n")
+                auth_service.login(usernameIn, passwordIn, source="terminal")
+            except UnknownUserError:
                 print(f"🔤 | Invalid User: the provided username doesn't exist in our records, try again later..\n")
+            except IncorrectPasswordError:
+                print("❌ | Incorrect Password\n")
+                print(f"🔤 | Invalid Input: incorrect password, try again later..\n")
+            except InactiveAccountError:
+                print(f"🔒 | Inactive Account: this account has been deactivated, contact an administrator..\n")
+            except RateLimitedError as r:
+                print(f"⏳ | Too Many Attempts: try again in {r.retry_after:.0f} seconds..\n")
+            except Exception as e:
+                print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {e}")
             else:
-                try:
-                    fetch_user = users_collection.find({"username": usernameIn})
-                    for i in fetch_user:
-                        print("🔄 | Verifying Username & Password..\n")
-                        if i['username'] == usernameIn.lower() and i['password'] == passwordIn:
-                            print("✅ | username & password has been verified\n")
-                            return True
-                        elif i['username'] == usernameIn.lower() and i['password'] != passwordIn:
-                            print("❌ | Incorrect Password\n")
-                            raise UserWarning
-                        else:
-                            raise Exception
-                except UserWarning:
-                    print(f"🔤 | Invalid Input: incorrect password, try again later..\n")
-                except Exception as e:
-                    print(f"🔤 | Invalid Request: something went wrong, try again later..\n🚧 | {e}")
+                print("✅ | username & password has been verified\n")
+                return True
+    return False
 
 
 def authenticator() -> bool:
@@ -0,0 +1,200 @@
+import re
+import unicodedata
+from datetime import datetime
+from threading import Lock
+from time import perf_counter
+
+
+class FieldValidationError(ValueError):
+    """
+    Raised when a value doesn't meet its field's rule.
+
+    Key Attributes:
+        field: The name of the invalid field.
+    """
+
+    def __init__(self, field:str, message:str) -> None:
+        super().__init__(message)
+        self.field = field
+
+
+class FieldRule:
+    """
+    Summary of the FieldRule Class:
+        The FieldRule class is the schema of one record field: its expected type, its length bounds, its precompiled pattern or its allowed choices, and how its value is normalized before it is stored.
+
+    Key Attributes:
+        field: The name of the field.
+        message: The error message raised when a value is invalid.
+        kind: The expected type of the value (default is str).
+        min_length / max_length: The length bounds of a string value.
+        pattern: A precompiled regex the whole value must match.
+        choices: The allowed values, compared lowercased.
+        normalize: A function applied to a valid value, it may raise a ValueError too (e.g. an impossible date).
+        normalize_first: Apply normalize before the length, pattern & choices checks, so they hold for the stored value (default is False). It is used by the username, whose canonical form may be longer or shorter than the provided value.
+
+    Methods:
+        check: Validates a value and returns its normalized value.
+    """
+
+    def __init__(self, field:str, message:str, kind:type=str, min_length:int=None, max_length:int=None, pattern=None, choices=None, normalize=None, normalize_first:bool=False) -> None:
+        self.field = field
+        self.message = message
+        self.kind = kind
+        self.min_length = min_length
+        self.max_length = max_length
+        self.pattern = pattern
+        self.choices = choices
+        self.normalize = normalize
+        self.normalize_first = normalize_first
+
+    def check(self, value):
+        if not isinstance(value, self.kind):
+            raise FieldValidationError(self.field, self.message)
+        if self.normalize_first:
+            value = self._normalize(value)
+        if self.min_length is not None and len(value) < self.min_length:
+            raise FieldValidationError(self.field, self.message)
+        if self.max_length is not None and len(value) > self.max_length:
+            raise FieldValidationError(self.field, self.message)
+        if self.pattern is not None and self.pattern.fullmatch(value) is None:
+            raise FieldValidationError(self.field, self.message)
+        if self.choices is not None and value.lower() not in self.choices:
+            raise FieldValidationError(self.field, self.message)
+        if self.normalize is None or self.normalize_first:
+            return value
+        return self._normalize(value)
+
+    def _normalize(self, value):
+        try:
+            return self.normalize(value)
+        except ValueError:
+            raise FieldValidationError(self.field, self.message)
+
+
+_USERNAME = re.compile(r"\S+")
+
+
+def normalize_username(username:str) -> str:
+    """
+    Return the canonical form of a username, the only form stored in and looked up from the users_collection.
+
+    The username is NFKC-normalized (e.g. full-width letters become ASCII letters) and case-folded (e.g. "Straße" and "STRASSE" both become "strasse"), so every case variant of a username is the same key of the unique "username" index, and a case-insensitive lookup is a plain index seek.
+    Case folding may produce characters that aren't NFKC-normalized, so the folded username is normalized once more.
+    """
+    return unicodedata.normalize("NFKC", unicodedata.normalize("NFKC", username).casefold())
+_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+
+
+def _parseDate(value:str) -> datetime:
+    year, month, day = _DATE.fullmatch(value).groups()
+    date = datetime(int(year), int(month), int(day))
+    if date.year < 1900 or date > datetime.today():
+        raise ValueError(value)
+    return date
+
+
+# The schema of every record field, shared by the terminal flow, the User class, the AuthService, the async API and the bulk paths
+SCHEMA = {
+    "username": FieldRule("username", "username length should be at least 6 characters, without spaces", min_length=6, max_length=64, pattern=_USERNAME, normalize=normalize_username, normalize_first=True),
+    "password": FieldRule("password", "password length should be at least 8 characters", min_length=8, max_length=1024),
+    "first_name": FieldRule("first_name", "first name length should be at least 3 characters", min_length=3, max_length=64, normalize=str.capitalize),
+    "last_name": FieldRule("last_name", "last name length should be at least 3 characters", min_length=3, max_length=64, normalize=str.capitalize),
+    "dob": FieldRule("dob", "date of birth should be a past date in the following formate 'Year-Month-Day' e.x. 1999-6-27", pattern=_DATE, normalize=_parseDate),
+    "gender": FieldRule("gender", "gender must be one of the following: ['male', 'female']", choices={"male", "female"}, normalize=str.capitalize),
+    "role": FieldRule("role", "role must be one of the following: ['user', 'admin', 'developer']", choices={"user", "admin", "developer"}, normalize=str.lower),
+    "account_state": FieldRule("account_state", "account_state must be a boolean", kind=bool),
+    "comment": FieldRule("comment", "comment length should be at least 5 characters", min_length=5, max_length=4096),
+}
+# Fields a new account must provide, "role" is optional and defaults to "user"
+ACCOUNT_FIELDS = ["username", "password", "first_name", "last_name", "dob", "gender"]
+
+_stats = {"records": 0, "failed": 0, "seconds": 0.0}
+_stats_lock = Lock()
+
+
+def validate(field:str, value):
+    """
+    Validate one field value against its rule, and return its normalized value.
+
+    Raises:
+        FieldValidationError: If the field is unknown or the value is invalid.
+    """
+    rule = SCHEMA.get(field)
+    if rule is None:
+        raise FieldValidationError(field, f"unknown field '{field}'")
+    return rule.check(value)
+
+
+def _validateRecord(record:dict, required:list) -> dict:
+    if len(record) == 0:
+        raise FieldValidationError(None, "no fields were provided")
+    for field in required:
+        if field not in record:
+            raise FieldValidationError(field, f"{field} is required")
+    return {field: validate(field, value) for field, value in record.items()}
+
+
+def validate_record(record:dict, required:list=()) -> dict:
+    """
+    Summary of the validate_record Function:
+        The validate_record function validates every field of a record before any database round trip, and returns the normalized record.
+
+    Parameters:
+        record (dict): The fields and their values.
+        required (list): The fields that must be present, e.g. ACCOUNT_FIELDS for a new account.
+
+    Returns:
+        dict: The normalized record (canonical username, capitalized names & gender, lowercased role, parsed DOB).
+
+    Raises:
+        FieldValidationError: Raised for the first missing, unknown or invalid field.
+    """
+    started = perf_counter()
+    try:
+        record = _validateRecord(record, required)
+    except FieldValidationError:
+        _record(1, 1, perf_counter() - started)
+        raise
+    _record(1, 0, perf_counter() - started)
+    return record
+
+
+def validate_many(records, required:list=()) -> list:
+    """
+    Summary of the validate_many Function:
+        The validate_many function validates a batch of records, e.g. the rows of a bulk import, without stopping at the first invalid record.
+
+    Parameters:
+        records: An iterable of records.
+        required (list): The fields every record must provide.
+
+    Returns:
+        list: One (normalized record, None) or (None, FieldValidationError) tuple per record, in the same order.
+    """
+    started = perf_counter()
+    results = []
+    failed = 0
+    for record in records:
+        try:
+            results.append((_validateRecord(record, required), None))
+        except FieldValidationError as v:
+            results.append((None, v))
+            failed += 1
+    _record(len(results), failed, perf_counter() - started)
+    return results
+
+
+def _record(records:int, failed:int, seconds:float) -> None:
+    with _stats_lock:
+        _stats['records'] += records
+        _stats['failed'] += failed
+        _stats['seconds'] += seconds
+
+
+def validation_stats() -> dict:
+    """Return how many records were validated by validate_record/validate_many, how many failed, and the total and average time spent, in seconds."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['average'] = stats['seconds'] / stats['records'] if stats['records'] else 0.0
+    return stats